@@ -0,0 +1,260 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from grading import DEFAULT_POLICY
+from storage import RESULTS_DIR
+
+RESULT_TABLES = ['overall_stats', 'subject_stats', 'grade_dist',
+                 'performance_metrics', 'subject_performance',
+                 'subject_histogram', 'subject_percentiles']
+
+# Marks are integers in this range, so histograms have one bucket per mark
+MARKS_RANGE = range(0, 101)
+PERCENTILES = [10, 25, 50, 75, 90, 99]
+
+# Persisted aggregate state used by incremental analysis runs
+STATE_DIR = os.path.join(RESULTS_DIR, '_state')
+
+# Label of a missing subject or grade, however the engine or file format reported it
+MISSING_LABEL = 'nan'
+
+def label_strings(values):
+    """Subject or grade labels as strings, with every missing value as MISSING_LABEL
+
+    pandas reads a missing label as NaN and Spark as None, which astype(str) would
+    turn into different strings.
+    """
+    return values.astype(object).where(values.notna(), MISSING_LABEL).astype(str)
+
+def weighted_quantile(values, weights, q):
+    """Smallest value whose cumulative weight reaches q of the total (values sorted)"""
+    cumulative = np.cumsum(weights)
+    if len(cumulative) == 0 or cumulative[-1] == 0:
+        return np.nan
+    return float(values[np.searchsorted(cumulative, q * cumulative[-1], side='left')])
+
+def describe_counts(counts):
+    """Average, sample std, min, max, median and row count from a (marks, count) table"""
+    total = int(counts['count'].sum())
+    valid = counts.dropna(subset=['marks'])
+    valid = valid.groupby('marks', as_index=False)['count'].sum().sort_values('marks')
+    values = valid['marks'].to_numpy(dtype=float)
+    weights = valid['count'].to_numpy(dtype=float)
+    n = weights.sum()
+
+    if n == 0:
+        return dict(average_marks=np.nan, std_deviation=np.nan, minimum_marks=np.nan,
+                    maximum_marks=np.nan, total=total, median_marks=np.nan)
+
+    mean = (values * weights).sum() / n
+    std = np.sqrt((weights * (values - mean) ** 2).sum() / (n - 1)) if n > 1 else np.nan
+    return dict(
+        average_marks=mean,
+        std_deviation=std,
+        minimum_marks=values[0],
+        maximum_marks=values[-1],
+        total=total,
+        median_marks=weighted_quantile(values, weights, 0.5)
+    )
+
+def summarize_counts(counts, policy=None):
+    """Build the five analysis result tables from a (subject, grade, marks, count) table
+
+    The counts table is tiny (at most subjects x grades x distinct marks rows), so
+    everything here runs on the driver after a single aggregation pass over the data.
+    With a grading policy, the counts are regraded under it (resolving any curve from
+    the counts themselves), so a new policy never needs the marks to be rescanned;
+    without one, the stored grades and the default pass mark are used.
+    """
+    counts = counts.copy()
+    counts['subject'] = label_strings(counts['subject'])
+    counts['grade'] = label_strings(counts['grade'])
+    if policy is not None:
+        policy = policy.resolve(counts)
+        grades = policy.grades(counts['subject'], counts['marks'])
+        # Unusable marks keep their stored grade
+        counts['grade'] = np.where(pd.isna(grades), counts['grade'], grades)
+    policy = policy or DEFAULT_POLICY
+    passed = policy.passed(counts['subject'], counts['marks'])
+    counts['passed'] = np.where(passed, counts['count'], 0)
+    counts['failed'] = np.where(~passed & counts['marks'].notna(), counts['count'], 0)
+    counts['distinction'] = np.where(counts['grade'] == policy.distinction_grade, counts['count'], 0)
+
+    # 1. Overall Statistics
+    overall = describe_counts(counts)
+    overall_stats = pd.DataFrame([{
+        'average_marks': overall['average_marks'],
+        'std_deviation': overall['std_deviation'],
+        'minimum_marks': overall['minimum_marks'],
+        'maximum_marks': overall['maximum_marks'],
+        'total_entries': overall['total']
+    }])
+
+    # 2. Subject-wise Statistics
+    subject_rows = []
+    for subject, group in counts.groupby('subject', sort=True):
+        stats = describe_counts(group)
+        subject_rows.append({
+            'subject': subject,
+            'average_marks': stats['average_marks'],
+            'std_deviation': stats['std_deviation'],
+            'minimum_marks': stats['minimum_marks'],
+            'maximum_marks': stats['maximum_marks'],
+            'total_students': stats['total'],
+            'median_marks': stats['median_marks']
+        })
+    subject_stats = pd.DataFrame(subject_rows, columns=[
+        'subject', 'average_marks', 'std_deviation', 'minimum_marks',
+        'maximum_marks', 'total_students', 'median_marks'
+    ])
+
+    # 3. Grade Distribution
+    grade_dist = counts.groupby('grade', as_index=False)['count'].sum().sort_values('grade')
+
+    # 4. Performance Metrics
+    total = counts['count'].sum()
+    performance_metrics = pd.DataFrame([{
+        'pass_percentage': counts['passed'].sum() / total * 100,
+        'distinction_percentage': counts['distinction'].sum() / total * 100,
+        'fail_percentage': counts['failed'].sum() / total * 100
+    }])
+
+    # 5. Subject-wise Pass/Fail Analysis
+    subject_performance = counts.groupby('subject', as_index=False)[
+        ['count', 'passed', 'failed']
+    ].sum()
+    subject_performance['pass_percentage'] = (
+        subject_performance['passed'] / subject_performance['count'] * 100
+    )
+    subject_performance = subject_performance.rename(columns={
+        'passed': 'passed_students',
+        'failed': 'failed_students'
+    })[['subject', 'pass_percentage', 'passed_students', 'failed_students']]
+    subject_performance = subject_performance.sort_values(
+        'pass_percentage', ascending=False, kind='stable'
+    )
+
+    # 6. Exact per-subject histograms and percentiles
+    subject_histogram, subject_percentiles = histogram_tables(counts)
+
+    return {
+        'overall_stats': overall_stats,
+        'subject_stats': subject_stats,
+        'grade_dist': grade_dist.reset_index(drop=True),
+        'performance_metrics': performance_metrics,
+        'subject_performance': subject_performance.reset_index(drop=True),
+        'subject_histogram': subject_histogram,
+        'subject_percentiles': subject_percentiles
+    }
+
+def histogram_tables(counts):
+    """Per-subject mark histograms and exact percentiles from a counts table
+
+    Every subject gets one bucket per mark in MARKS_RANGE (empty buckets included);
+    any observed value outside that range gets its own bucket.
+    """
+    valid = counts.dropna(subset=['marks'])
+    histogram_rows = []
+    percentile_rows = []
+    for subject, group in valid.groupby('subject', sort=True):
+        observed = group.groupby('marks')['count'].sum()
+        buckets = observed.reindex(sorted(set(MARKS_RANGE) | set(observed.index)), fill_value=0)
+        values = buckets.index.to_numpy(dtype=float)
+        weights = buckets.to_numpy()
+
+        histogram_rows.append(pd.DataFrame({
+            'subject': subject,
+            'marks': values,
+            'count': weights.astype('int64')
+        }))
+        row = {'subject': subject}
+        for p in PERCENTILES:
+            row[f'p{p}'] = weighted_quantile(values, weights, p / 100)
+        percentile_rows.append(row)
+
+    subject_histogram = pd.concat(histogram_rows, ignore_index=True) if histogram_rows else \
+        pd.DataFrame(columns=['subject', 'marks', 'count'])
+    subject_percentiles = pd.DataFrame(
+        percentile_rows, columns=['subject'] + [f'p{p}' for p in PERCENTILES]
+    )
+    return subject_histogram, subject_percentiles
+
+def merge_counts(*tables):
+    """Merge (subject, grade, marks, count) tables by adding their counts"""
+    tables = [table for table in tables if table is not None and len(table) > 0]
+    if not tables:
+        return pd.DataFrame(columns=['subject', 'grade', 'marks', 'count'])
+    merged = pd.concat(tables, ignore_index=True)
+    merged['subject'] = label_strings(merged['subject'])
+    merged['grade'] = label_strings(merged['grade'])
+    return merged.groupby(['subject', 'grade', 'marks'], as_index=False, dropna=False)['count'].sum()
+
+def file_signature(path):
+    """Size and modification time used to detect changed input files"""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def load_state(state_dir=STATE_DIR):
+    """Load the persisted counts table and the signatures of the files folded into it"""
+    counts_path = os.path.join(state_dir, 'counts.csv')
+    files_path = os.path.join(state_dir, 'files.json')
+    if not (os.path.exists(counts_path) and os.path.exists(files_path)):
+        return None, {}
+    with open(files_path) as f:
+        processed = json.load(f)
+    return pd.read_csv(counts_path), processed
+
+def save_state(counts, processed, state_dir=STATE_DIR):
+    """Persist the counts table and the signatures of the files folded into it"""
+    os.makedirs(state_dir, exist_ok=True)
+    counts.to_csv(os.path.join(state_dir, 'counts.csv'), index=False)
+    with open(os.path.join(state_dir, 'files.json'), 'w') as f:
+        json.dump(processed, f, indent=2)
+
+def plan_incremental(files, processed):
+    """Split input files into (new_files, rebuild) against the persisted state
+
+    A rebuild is needed when a file that was already folded in changed or disappeared,
+    since its old contribution cannot be subtracted from the counts.
+    """
+    current = {path: file_signature(path) for path in files}
+    for path, signature in processed.items():
+        if current.get(path) != signature:
+            return files, True
+    return [path for path in files if path not in processed], False
+
+def incremental_counts(files, count_files, incremental=False):
+    """Counts table over `files`, persisted as aggregate state for the next run
+
+    `count_files(files)` is the engine's scan. When incremental, only files that were
+    not folded into the saved state are scanned and merged into it.
+    """
+    state_counts, processed = load_state() if incremental else (None, {})
+    new_files, rebuild = plan_incremental(files, processed)
+    if rebuild:
+        print("Input files changed since the last run, recomputing from scratch...")
+        state_counts, processed = None, {}
+    if incremental:
+        print(f"Folding {len(new_files)} new of {len(files)} marks files into saved state...")
+
+    print("Calculating statistics...")
+    counts = count_files(new_files) if new_files else None
+    counts = merge_counts(state_counts, counts)
+    processed.update({path: file_signature(path) for path in new_files})
+    save_state(counts, processed)
+    return counts
+
+def rank_table(average_counts):
+    """Overall rank and percentile for each distinct average from (average_marks, count)
+
+    Rank 1 is the highest average; ties share a rank. The percentile is the share of
+    other students with a strictly lower average (like percent_rank).
+    """
+    ranks = average_counts.sort_values('average_marks', ascending=False).reset_index(drop=True)
+    total = ranks['count'].sum()
+    higher = ranks['count'].cumsum() - ranks['count']
+    lower = total - higher - ranks['count']
+    ranks['overall_rank'] = (higher + 1).astype('int64')
+    ranks['percentile'] = lower / (total - 1) * 100 if total > 1 else 100.0
+    return ranks[['average_marks', 'overall_rank', 'percentile']]
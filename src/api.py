@@ -0,0 +1,152 @@
+import argparse
+import os
+import numpy as np
+from flask import Flask, abort, jsonify, request
+from sqlalchemy import select
+from grading import analysis_policy
+from instrumentation import configure_logging
+from results_db import (DATABASE_URL, POOL_SIZE, create_db_engine, grade_dist, marks, students,
+                        subject_stats)
+
+# Name search page size when none is given, and the largest page a client can ask for
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+def escape_like(term):
+    """Escape LIKE wildcards so a search term only matches literally"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def page_args():
+    """(limit, offset) from the query string, validated"""
+    try:
+        limit = int(request.args.get('limit', DEFAULT_LIMIT))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        abort(400, description="limit and offset must be integers")
+    if not 1 <= limit <= MAX_LIMIT or offset < 0:
+        abort(400, description=f"limit must be 1-{MAX_LIMIT} and offset must be >= 0")
+    return limit, offset
+
+def create_app(database_url=None, pool_size=POOL_SIZE):
+    """Read-only JSON API over the results database built by results_db.py
+
+    All request threads share one pooled engine; every request borrows a connection
+    for the duration of its queries only.
+    """
+    database_url = database_url or DATABASE_URL
+    engine = create_db_engine(database_url, read_only=True, pool_size=pool_size)
+    if engine.dialect.name == 'sqlite' and not os.path.exists(engine.url.database or ''):
+        raise FileNotFoundError(f"{engine.url.database} not found. "
+                                "Please run results_db.py to load the generator output first!")
+
+    # Grades are served under the policy the analysis ran with, like its summary tables
+    policy = analysis_policy()
+
+    app = Flask(__name__)
+    app.json.sort_keys = False
+    app.extensions['rms_engine'] = engine
+
+    @app.errorhandler(400)
+    @app.errorhandler(404)
+    def json_error(error):
+        return jsonify(error=error.name, message=error.description), error.code
+
+    @app.get('/health')
+    def health():
+        with engine.connect() as connection:
+            connection.exec_driver_sql('SELECT 1')
+        return jsonify(status='ok')
+
+    @app.get('/students/<student_id>')
+    def get_student(student_id):
+        student_id = student_id.upper()
+        with engine.connect() as connection:
+            student = connection.execute(
+                select(students).where(students.c.student_id == student_id)
+            ).mappings().first()
+            if student is None:
+                abort(404, description=f"No student with ID {student_id}")
+            student_marks = connection.execute(
+                select(marks.c.subject, marks.c.marks, marks.c.grade)
+                .where(marks.c.student_id == student_id)
+                .order_by(marks.c.subject)
+            ).mappings().all()
+
+        subjects = [row['subject'] for row in student_marks]
+        # Missing marks become NaN: no grade and not passed
+        values = np.array([row['marks'] for row in student_marks], dtype=float)
+        grades = policy.grades(subjects, values)
+        scores = values[~np.isnan(values)]
+        return jsonify(
+            **student,
+            average_marks=float(scores.mean()) if len(scores) else None,
+            subjects_passed=int(policy.passed(subjects, values).sum()),
+            total_subjects=len(student_marks),
+            marks=[dict(row, grade=grade) for row, grade in zip(student_marks, grades)]
+        )
+
+    @app.get('/students')
+    def search_students():
+        name = request.args.get('name', '').strip()
+        if not name:
+            abort(400, description="The name query parameter is required")
+        limit, offset = page_args()
+
+        # Case-insensitive prefix match answered from the NOCASE name index
+        query = select(students) \
+            .where(students.c.name.like(f'{escape_like(name)}%', escape='\\')) \
+            .order_by(students.c.name, students.c.student_id) \
+            .limit(limit + 1).offset(offset)
+        with engine.connect() as connection:
+            rows = connection.execute(query).mappings().all()
+        return jsonify(
+            results=[dict(row) for row in rows[:limit]],
+            limit=limit,
+            offset=offset,
+            has_more=len(rows) > limit
+        )
+
+    @app.get('/subjects/stats')
+    def all_subject_stats():
+        with engine.connect() as connection:
+            rows = connection.execute(
+                select(subject_stats).order_by(subject_stats.c.subject)
+            ).mappings().all()
+        return jsonify(subjects=[dict(row) for row in rows])
+
+    @app.get('/subjects/<subject>/stats')
+    def one_subject_stats(subject):
+        with engine.connect() as connection:
+            row = connection.execute(
+                select(subject_stats).where(subject_stats.c.subject == subject)
+            ).mappings().first()
+        if row is None:
+            abort(404, description=f"No subject named {subject}")
+        return jsonify(**row)
+
+    @app.get('/grades/distribution')
+    def grade_distribution():
+        with engine.connect() as connection:
+            rows = connection.execute(
+                select(grade_dist).order_by(grade_dist.c.grade)
+            ).mappings().all()
+        total = sum(row['count'] for row in rows)
+        return jsonify(grades=[
+            dict(row, percentage=row['count'] / total * 100 if total else None) for row in rows
+        ])
+
+    return app
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve the results database as a JSON API")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on")
+    parser.add_argument('--port', type=int, default=5000, help="Port to listen on")
+    parser.add_argument('--url', default=DATABASE_URL,
+                        help="SQLAlchemy database URL (default: RMS_DATABASE_URL or data/results.db)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_logging()
+    # Threaded, so concurrent lookups are served from the connection pool
+    create_app(args.url).run(host=args.host, port=args.port, threaded=True)
@@ -0,0 +1,260 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import local_analysis
+from aggregates import RESULT_TABLES, summarize_counts
+from columnar_store import remove_columnar_store
+from data_generator import write_streaming
+from marks_store import remove_marks_by_student
+from storage import DEFAULT_FORMAT, RESULTS_DIR, files_size, table_files, write_table
+
+# Dataset sizes (number of students); every dataset is generated with the same seed
+SIZES = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000
+}
+SEED = 42
+BATCH_SIZE = 500_000
+
+# Lookups timed per query kind
+NUM_QUERIES = 200
+
+BENCHMARK_DIR = 'benchmarks'
+
+# A metric is reported as a regression when it gets this much worse than the baseline
+REGRESSION_THRESHOLD = 0.10
+
+class Timer:
+    """Collect named wall-clock timings in seconds"""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+def latency_stats(seconds):
+    """p50/p99/mean latency in milliseconds"""
+    ms = np.asarray(seconds) * 1000
+    return {
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'mean_ms': float(ms.mean()),
+        'queries': int(len(ms))
+    }
+
+def bench_generation(num_students, fmt, columnar):
+    """Generate the dataset and report its throughput"""
+    # As in data_generator.main, derived stores from an older dataset would go stale
+    remove_columnar_store()
+    remove_marks_by_student()
+    start = time.perf_counter()
+    written = write_streaming(num_students, min(BATCH_SIZE, num_students), SEED, fmt,
+                              report=False, columnar=columnar)
+    seconds = time.perf_counter() - start
+    return {
+        'seconds': seconds,
+        'students': written['num_students'],
+        'mark_rows': written['num_marks'],
+        'mark_rows_per_sec': written['num_marks'] / seconds,
+        'students_per_sec': written['num_students'] / seconds
+    }
+
+def bench_local_analysis(fmt):
+    """Time each stage of the local analysis engine"""
+    timer = Timer()
+    with timer.stage('list_files'):
+        files = table_files('marks', fmt)
+    with timer.stage('count_marks'):
+        counts = local_analysis.count_marks(files, fmt)
+    with timer.stage('summarize'):
+        results = summarize_counts(counts)
+    with timer.stage('write_results'):
+        for name in RESULT_TABLES:
+            write_table(results[name], name, fmt, RESULTS_DIR)
+    timer.timings['total'] = sum(timer.timings.values())
+    return timer.timings
+
+def bench_spark_analysis(fmt):
+    """Time each stage of the Spark analysis, including session startup"""
+    import spark_analysis
+
+    timer = Timer()
+    files = table_files('marks', fmt)
+    with timer.stage('session_startup'):
+        spark = spark_analysis.create_spark_session(None, files_size(files))
+    try:
+        with timer.stage('count_marks'):
+            counts = spark_analysis.count_marks(spark, files, fmt)
+        with timer.stage('summarize'):
+            results = summarize_counts(counts)
+        with timer.stage('write_results'):
+            for name in RESULT_TABLES:
+                write_table(results[name], name, fmt, RESULTS_DIR)
+        with timer.stage('analyze_students'):
+            spark_analysis.analyze_students(spark, fmt)
+    finally:
+        spark.stop()
+    timer.timings['total'] = sum(timer.timings.values())
+    return timer.timings
+
+def bench_dashboard(num_queries=NUM_QUERIES):
+    """Time the dashboard's cold data load and search_student latency"""
+    import dashboard
+
+    timer = Timer()
+    for cached in (dashboard.read_analysis_tables, dashboard.read_distribution_tables,
+                   dashboard.build_analysis_views, dashboard.build_distribution_views,
+                   dashboard.read_student_data, dashboard.build_student_index):
+        cached.clear()
+    with timer.stage('load_analysis'):
+        dashboard.load_data()
+        dashboard.load_analysis_views()
+        dashboard.load_distribution_data()
+    with timer.stage('load_student_index'):
+        index = dashboard.load_student_index()
+    with timer.stage('load_cached'):
+        dashboard.load_data()
+        dashboard.load_student_index()
+
+    rng = np.random.default_rng(SEED)
+    rows = rng.integers(0, len(index), size=num_queries)
+    queries = {
+        'id_lookup': [index.student_ids[row] for row in rows],
+        'name_lookup': index.students['name'].iloc[rows].tolist()
+    }
+    latency = {}
+    for kind, terms in queries.items():
+        seconds = []
+        for term in terms:
+            start = time.perf_counter()
+            dashboard.search_student(index, term)
+            seconds.append(time.perf_counter() - start)
+        latency[kind] = latency_stats(seconds)
+    return {'load_seconds': timer.timings, 'search_student': latency}
+
+def run_size(label, num_students, fmt, engine, columnar, num_queries):
+    """Benchmark one dataset size inside its own working directory"""
+    work_dir = os.path.join(BENCHMARK_DIR, label)
+    os.makedirs(work_dir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        print(f"[{label}] generating {num_students:,} students...")
+        result = {'students': num_students, 'generation': bench_generation(num_students, fmt, columnar)}
+        print(f"[{label}] analysis ({engine})...")
+        bench_analysis = bench_spark_analysis if engine == 'spark' else bench_local_analysis
+        result['analysis'] = bench_analysis(fmt)
+        print(f"[{label}] dashboard load and search...")
+        result['dashboard'] = bench_dashboard(num_queries)
+    finally:
+        os.chdir(cwd)
+    return result
+
+def flatten(results, prefix=''):
+    """Flatten nested results to {'a.b.c': number}"""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{name}.'))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """Rows of (metric, baseline, current, change) and the metrics that regressed
+
+    Throughput metrics (*_per_sec) regress when they drop, all timings when they grow.
+    Dataset sizes and query counts are not compared.
+    """
+    current, baseline = flatten(current['sizes']), flatten(baseline['sizes'])
+    rows, regressions = [], []
+    for metric in sorted(set(current) & set(baseline)):
+        if metric.endswith(('.students', '.mark_rows', '.queries')) or not baseline[metric]:
+            continue
+        change = current[metric] / baseline[metric] - 1
+        worse = -change if metric.endswith('_per_sec') else change
+        rows.append((metric, baseline[metric], current[metric], change))
+        if worse > threshold:
+            regressions.append(metric)
+    return pd.DataFrame(rows, columns=['metric', 'baseline', 'current', 'change']), regressions
+
+def main(sizes=tuple(SIZES), fmt=DEFAULT_FORMAT, engine='local', columnar=False,
+         num_queries=NUM_QUERIES, output=None, baseline=None):
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'seed': SEED,
+        'format': fmt,
+        'engine': engine,
+        'columnar': columnar,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sizes': {}
+    }
+    for label in sizes:
+        results['sizes'][label] = run_size(label, SIZES[label], fmt, engine, columnar, num_queries)
+
+    output = output or os.path.join(BENCHMARK_DIR,
+                                    f"results-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    for label, result in results['sizes'].items():
+        generation, dashboard = result['generation'], result['dashboard']
+        print(f"\n{label}: {generation['mark_rows_per_sec']:,.0f} mark rows/sec generated, "
+              f"analysis {result['analysis']['total']:.2f}s, "
+              f"student index {dashboard['load_seconds']['load_student_index']:.2f}s")
+        for kind, stats in dashboard['search_student'].items():
+            print(f"  {kind}: p50 {stats['p50_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms")
+
+    if baseline:
+        with open(baseline) as f:
+            table, regressions = compare(results, json.load(f))
+        print(f"\nComparison with {baseline}:")
+        print(table.to_string(index=False, float_format=lambda value: f'{value:,.4f}'))
+        if regressions:
+            print(f"\nRegressions over {REGRESSION_THRESHOLD:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark generation, analysis and dashboard queries at fixed dataset sizes "
+                    "(storage format: RMS_STORAGE_FORMAT, as for the dashboard)")
+    parser.add_argument('--sizes', nargs='+', choices=SIZES, default=list(SIZES),
+                        help="Dataset sizes to run (default: all)")
+    parser.add_argument('--engine', choices=['local', 'spark'], default='local',
+                        help="Analysis engine to benchmark")
+    parser.add_argument('--columnar', action='store_true',
+                        help="Also write the columnar marks store (the dashboard then uses it)")
+    parser.add_argument('--queries', type=int, default=NUM_QUERIES,
+                        help="Lookups timed per query kind")
+    parser.add_argument('--output', default=None,
+                        help="Results file (default: benchmarks/results-<timestamp>.json)")
+    parser.add_argument('--baseline', default=None,
+                        help="Earlier results file to compare against; exits 1 on regressions")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    sys.exit(main(args.sizes, DEFAULT_FORMAT, args.engine, args.columnar, args.queries,
+                  args.output, args.baseline))
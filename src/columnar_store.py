@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from marks_store import NotGroupedError, student_runs, write_grouped_marks
+from storage import DATA_DIR, DEFAULT_FORMAT, FORMATS
+
+# Fixed-width binary marks store, read with np.memmap:
+#   marks.bin        6-byte records (student index, subject code, marks), grouped by student
+#   student_ids.npy  student ID of each student index
+#   offsets.npy      first record of each student index (plus the total at the end)
+#   dictionary.json  subject names and grade boundaries (grades are derived on read)
+COLUMNAR_DIR = os.path.join(DATA_DIR, 'marks_columnar')
+
+RECORD_DTYPE = np.dtype([('student', '<u4'), ('subject', 'u1'), ('marks', 'u1')])
+
+# Records processed at a time when scanning the whole store
+CHUNK_RECORDS = 4_000_000
+
+class ColumnarMarksWriter:
+    """Append marks batches to a columnar store
+
+    Students must arrive grouped (each student's marks contiguous), as the generator
+    emits them.
+    """
+
+    def __init__(self, subjects, grade_bins, grade_labels, path=COLUMNAR_DIR):
+        self.path = path
+        self.subjects = list(subjects)
+        self.grade_bins = [int(b) for b in grade_bins]
+        self.grade_labels = list(grade_labels)
+        remove_columnar_store(path)
+        os.makedirs(path)
+        self.records = open(os.path.join(path, 'marks.bin'), 'wb')
+        self.student_ids = []
+        self.counts = []
+        self.num_students = 0
+        self.num_records = 0
+
+    def write(self, marks_df):
+        run_ids, run_counts = student_runs(marks_df['student_id'].astype(str).to_numpy())
+        # A run continuing the previous batch's last student keeps that student's index
+        continues = bool(self.student_ids) and len(run_ids) > 0 \
+            and run_ids[0] == self.student_ids[-1][-1]
+        run_indexes = np.arange(len(run_ids)) + self.num_students - (1 if continues else 0)
+        student_index = np.repeat(run_indexes, run_counts)
+        if continues:
+            self.counts[-1][-1] += run_counts[0]
+            run_ids, run_counts = run_ids[1:], run_counts[1:]
+
+        subject_codes = pd.Categorical(marks_df['subject'].astype(str), categories=self.subjects).codes
+        if (subject_codes < 0).any():
+            raise ValueError("Marks contain subjects missing from the dictionary")
+
+        records = np.empty(len(marks_df), dtype=RECORD_DTYPE)
+        records['student'] = student_index
+        records['subject'] = subject_codes
+        records['marks'] = marks_df['marks'].to_numpy()
+        records.tofile(self.records)
+
+        if len(run_ids):
+            self.student_ids.append(run_ids)
+            self.counts.append(run_counts)
+        self.num_students += len(run_ids)
+        self.num_records += len(records)
+
+    def close(self):
+        self.records.close()
+        student_ids = np.concatenate(self.student_ids) if self.student_ids else np.array([], dtype=str)
+        counts = np.concatenate(self.counts) if self.counts else np.array([], dtype=np.int64)
+        if len(pd.unique(student_ids)) != len(student_ids):
+            raise NotGroupedError("Marks are not grouped by student; use build_columnar_store()")
+        np.save(os.path.join(self.path, 'student_ids.npy'), student_ids.astype(str))
+        np.save(os.path.join(self.path, 'offsets.npy'),
+                np.concatenate([[0], np.cumsum(counts)]).astype(np.int64))
+        with open(os.path.join(self.path, 'dictionary.json'), 'w') as f:
+            json.dump({
+                'subjects': self.subjects,
+                'grade_bins': self.grade_bins,
+                'grade_labels': self.grade_labels,
+                'num_students': int(len(student_ids)),
+                'num_records': int(self.num_records)
+            }, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def remove_columnar_store(path=COLUMNAR_DIR):
+    """Delete a columnar store so it cannot go stale"""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+
+def build_columnar_store(subjects, grade_bins, grade_labels, fmt=DEFAULT_FORMAT,
+                         path=COLUMNAR_DIR):
+    """Build the columnar store from the marks table"""
+    return write_grouped_marks(
+        lambda: ColumnarMarksWriter(subjects, grade_bins, grade_labels, path), fmt, CHUNK_RECORDS)
+
+class ColumnarMarks:
+    """Zero-copy reader over a columnar store
+
+    Records are memory-mapped, so only the pages a lookup or scan touches are read.
+    Provides get(student_id) for the dashboard and counts() for the analysis.
+    """
+
+    def __init__(self, path=COLUMNAR_DIR):
+        with open(os.path.join(path, 'dictionary.json')) as f:
+            dictionary = json.load(f)
+        self.subjects = np.array(dictionary['subjects'], dtype=object)
+        self.grade_bins = np.array(dictionary['grade_bins'])
+        self.grade_labels = np.array(dictionary['grade_labels'], dtype=object)
+        self.records = np.memmap(os.path.join(path, 'marks.bin'), dtype=RECORD_DTYPE, mode='r') \
+            if dictionary['num_records'] else np.empty(0, dtype=RECORD_DTYPE)
+        self.student_ids = np.load(os.path.join(path, 'student_ids.npy'), mmap_mode='r')
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+        self.positions = pd.Index(self.student_ids)
+
+    def __len__(self):
+        return len(self.records)
+
+    def grade_codes(self, marks):
+        """Grade code of each mark from the dictionary's grade boundaries"""
+        return np.searchsorted(self.grade_bins, marks, side='right') - 1
+
+    def get(self, student_id):
+        """The student's marks as a DataFrame (empty if the student has none)"""
+        if student_id not in self.positions:
+            return pd.DataFrame(columns=['student_id', 'subject', 'marks', 'grade'])
+        position = self.positions.get_loc(student_id)
+        records = self.records[self.offsets[position]:self.offsets[position + 1]]
+        marks = records['marks'].astype(np.int64)
+        return pd.DataFrame({
+            'student_id': student_id,
+            'subject': self.subjects[records['subject']],
+            'marks': marks,
+            'grade': self.grade_labels[self.grade_codes(marks)]
+        })
+
+    def counts(self, chunk_records=CHUNK_RECORDS):
+        """(subject, grade, marks, count) table computed with np.bincount in chunks"""
+        width = 256
+        totals = np.zeros(len(self.subjects) * width, dtype=np.int64)
+        for start in range(0, len(self.records), chunk_records):
+            chunk = self.records[start:start + chunk_records]
+            keys = chunk['subject'].astype(np.int64) * width + chunk['marks']
+            totals += np.bincount(keys, minlength=len(totals))
+
+        keys = np.flatnonzero(totals)
+        subject_codes, marks = np.divmod(keys, width)
+        return pd.DataFrame({
+            'subject': self.subjects[subject_codes],
+            'grade': self.grade_labels[self.grade_codes(marks)],
+            'marks': marks.astype(float),
+            'count': totals[keys]
+        })
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the memory-mapped columnar marks store")
+    parser.add_argument('--format', choices=FORMATS, default=DEFAULT_FORMAT,
+                        help="Storage format of the marks table")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    from data_generator import SUBJECTS
+    from grading import GRADE_BINS, GRADE_LABELS
+    args = parse_args()
+    print("Building columnar marks store...")
+    rows = build_columnar_store(SUBJECTS, GRADE_BINS, GRADE_LABELS, args.format)
+    print(f"Wrote {rows:,} marks to {COLUMNAR_DIR}")
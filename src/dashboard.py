@@ -3,113 +3,275 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import io
+import logging
 import os
-from typing import Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from columnar_store import COLUMNAR_DIR, ColumnarMarks
+from instrumentation import RECENT_EVENTS, configure_logging, instrument, logger, peak_rss_mb
+from marks_store import MARKS_BY_STUDENT_PATH, MARKS_INDEX_PATH, LazyMarks
+from storage import DATA_DIR, DEFAULT_FORMAT, RESULTS_DIR, files_version, read_table, table_version
+from grading import ANALYSIS_POLICY_PATH, analysis_policy
+from student_index import StudentIndex
 
-# Set page configuration
-st.set_page_config(
-    page_title="Student Result Management System",
-    page_icon="📊",
-    layout="wide"
-)
+# Number of search results shown per page
+PAGE_SIZE = 20
 
-# Custom CSS
-st.markdown("""
-    <style>
-    .main {
-        padding: 0rem 0rem;
-    }
-    .st-emotion-cache-18ni7ap {
-        background-color: #f0f2f6;
-        border-radius: 10px;
-        padding: 20px;
-        margin: 10px 0px;
-    }
-    .metric-card {
-        background-color: white;
-        padding: 20px;
-        border-radius: 10px;
-        box-shadow: 2px 2px 10px rgba(0,0,0,0.1);
-    }
-    </style>
-""", unsafe_allow_html=True)
+ANALYSIS_TABLES = ['overall_stats', 'subject_stats', 'grade_dist',
+                   'performance_metrics', 'subject_performance']
+
+# Stage events listed in the performance panel
+PERFORMANCE_EVENTS = 50
+
+# Threads reading tables concurrently, and how often the loading progress is refreshed
+LOADER_THREADS = 8
+PROGRESS_INTERVAL = 0.2
+
+# Data is cached per "version": the path, mtime and size of every file it is read from.
+# Streamlit reruns main() on every interaction, but files are only re-read after the
+# generator or spark_analysis.py rewrites them.
+
+def data_version(names, base_dir=DATA_DIR):
+    """Cache key for a set of tables"""
+    return tuple(table_version(name, DEFAULT_FORMAT, base_dir) for name in names)
 
+def total_rows(tables):
+    """Rows across a tuple of DataFrames (None entries count as empty)"""
+    return sum(len(table) for table in tables if table is not None)
+
+# Streamlit re-executes this script on every rerun, so the pool is kept as a cached
+# resource rather than a module global. Background loads and the concurrent table reads
+# they start share it; it is large enough that nested reads never wait on their parent.
+
+@st.cache_resource(show_spinner=False)
+def loader_pool():
+    """Thread pool for reading tables concurrently"""
+    return ThreadPoolExecutor(max_workers=LOADER_THREADS, thread_name_prefix='rms-loader')
+
+def read_tables(names, base_dir=DATA_DIR):
+    """Read several tables concurrently, in the order given"""
+    return tuple(loader_pool().map(lambda name: read_table(name, DEFAULT_FORMAT, base_dir), names))
+
+# Loaders log a stage event only when they actually read (cache misses)
+
+@st.cache_data(max_entries=1, show_spinner=False)
+@instrument(rows=total_rows)
+def read_analysis_tables(version):
+    """Read the analysis result tables"""
+    return read_tables(ANALYSIS_TABLES, RESULTS_DIR)
+
+@st.cache_data(max_entries=1, show_spinner=False)
+@instrument(rows=total_rows)
+def read_distribution_tables(version):
+    """Read the per-subject histogram and percentile tables"""
+    return read_tables(['subject_histogram', 'subject_percentiles'], RESULTS_DIR)
+
+# Large tables are cached as shared resources (no copy per rerun); callers must not modify them.
+# They are loaded on the loader pool while the page renders, so they show no spinner of
+# their own; the search tab shows the loading progress instead.
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+@instrument()
+def read_student_results(version):
+    """Read the per-student results indexed by student_id"""
+    return read_table('student_results', DEFAULT_FORMAT, RESULTS_DIR).set_index('student_id')
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+@instrument(rows=total_rows)
+def read_student_data(version):
+    """Read the students and marks tables"""
+    students, marks = read_tables(['students', 'marks'])
+    
+    # Data info for debugging (RMS_LOG_LEVEL=DEBUG); skipped entirely otherwise
+    if logger.isEnabledFor(logging.DEBUG):
+        for name, df in (('students', students), ('marks', marks)):
+            info = io.StringIO()
+            df.info(buf=info)
+            logger.debug("%s table:\n%s\nFirst few rows:\n%s", name, info.getvalue(), df.head())
+    
+    return students, marks
+
+@st.cache_data(max_entries=1, show_spinner=False)
+def read_grading_policy(version):
+    """Read the grading policy of the last analysis run"""
+    return analysis_policy()
+
+def grading_policy_version():
+    """Cache key for the analysis grading policy (empty before any analysis run)"""
+    if not os.path.exists(ANALYSIS_POLICY_PATH):
+        return ()
+    return files_version([ANALYSIS_POLICY_PATH])
+
+def load_grading_policy():
+    """Load the policy the analysis graded with (the default policy before any run)"""
+    return read_grading_policy(grading_policy_version())
+
+@instrument(rows=total_rows, level=logging.DEBUG)
 def load_data():
-    """Load all analysis data"""
+    """Load the analysis result tables"""
     try:
-        overall_stats = pd.read_csv('analysis_results/overall_stats.csv')
-        subject_stats = pd.read_csv('analysis_results/subject_stats.csv')
-        grade_dist = pd.read_csv('analysis_results/grade_dist.csv')
-        performance_metrics = pd.read_csv('analysis_results/performance_metrics.csv')
-        subject_performance = pd.read_csv('analysis_results/subject_performance.csv')
-        return overall_stats, subject_stats, grade_dist, performance_metrics, subject_performance
+        return read_analysis_tables(data_version(ANALYSIS_TABLES, RESULTS_DIR))
     except FileNotFoundError:
         st.error("Data files not found. Please run data generation and analysis first!")
         st.stop()
 
-def load_student_data() -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Load student and marks data"""
-    try:
-        students = pd.read_csv('data/students.csv')
-        marks = pd.read_csv('data/marks.csv')
-        
-        # Print data info for debugging
-        print("\nStudents DataFrame Info:")
-        print(students.info())
-        print("\nFirst few rows of students data:")
-        print(students.head())
-        
-        print("\nMarks DataFrame Info:")
-        print(marks.info())
-        print("\nFirst few rows of marks data:")
-        print(marks.head())
-        
-        return students, marks
-        
-    except FileNotFoundError:
+@instrument(rows=None, level=logging.DEBUG)
+def load_analysis_views():
+    """Load the figures and formatted tables of the analysis tab"""
+    return build_analysis_views(data_version(ANALYSIS_TABLES, RESULTS_DIR))
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+@instrument()
+def build_student_index(version, marks_source='table'):
+    """Build the student lookup index
+
+    With the 'columnar' or 'lazy' marks source, marks are not loaded into memory: each
+    student's marks are read on demand from the memory-mapped columnar store or the
+    marks-by-student file, so memory does not grow with the marks table.
+    """
+    if marks_source == 'columnar':
+        return StudentIndex(read_table('students'), ColumnarMarks())
+    if marks_source == 'lazy':
+        return StudentIndex(read_table('students'), LazyMarks())
+    students, marks = read_student_data(version)
+    return StudentIndex(students, marks)
+
+def student_index_source():
+    """Cache key and marks source of the student index"""
+    # On-demand marks are used whenever the generator wrote a store for them
+    columnar_dictionary = os.path.join(COLUMNAR_DIR, 'dictionary.json')
+    if os.path.exists(columnar_dictionary):
+        version = (data_version(['students']),
+                   files_version([os.path.join(COLUMNAR_DIR, 'marks.bin'), columnar_dictionary]))
+        return version, 'columnar'
+    if os.path.exists(MARKS_INDEX_PATH):
+        version = (data_version(['students']),
+                   files_version([MARKS_BY_STUDENT_PATH, MARKS_INDEX_PATH]))
+        return version, 'lazy'
+    return data_version(['students', 'marks']), 'table'
+
+def stop_on_student_index_error(error):
+    """Show why the student index could not be loaded and stop the script"""
+    if isinstance(error, FileNotFoundError):
         st.error("Student data files not found! Please run data generation first.")
-        st.stop()
+    else:
+        st.error(f"Error loading data: {str(error)}")
+    st.stop()
+
+@instrument(level=logging.DEBUG)
+def load_student_index() -> StudentIndex:
+    """Load student and marks data as a lookup index"""
+    try:
+        return build_student_index(*student_index_source())
     except Exception as e:
-        st.error(f"Error loading data: {str(e)}")
-        st.stop()
+        stop_on_student_index_error(e)
 
-def search_student(student_df: pd.DataFrame, marks_df: pd.DataFrame, search_term: str):
-    """Search for a student and return their details and marks"""
+@instrument(rows=None, level=logging.DEBUG)
+def load_distribution_data():
+    """Load the per-subject histogram and percentile views, or None if missing"""
     try:
-        # Print debug info
-        print(f"Searching for: {search_term}")
-        print(f"Total students: {len(student_df)}")
-        
-        # Clean the search term
-        search_term = search_term.strip().upper()
-        
-        # First try exact student ID match
-        if search_term.startswith('STU'):
-            student = student_df[student_df['student_id'] == search_term]
-            if len(student) > 0:
-                student_marks = marks_df[marks_df['student_id'] == search_term]
-                return student, student_marks
-        
-        # Then try partial matches
-        student = student_df[
-            student_df['student_id'].str.contains(search_term, case=False, na=False) |
-            student_df['name'].str.contains(search_term, case=False, na=False)
-        ]
+        version = data_version(['subject_histogram', 'subject_percentiles'], RESULTS_DIR)
+        return build_distribution_views(version, grading_policy_version())
+    except FileNotFoundError:
+        return None
+
+# Background loads are started once per data version and shared by every rerun and
+# session, so a rerun while they are still running waits on the same futures.
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def submit_student_index(version, marks_source):
+    """Start building the student index on the loader pool"""
+    return loader_pool().submit(build_student_index, version, marks_source)
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def submit_student_results(version):
+    """Start reading the per-student results on the loader pool"""
+    return loader_pool().submit(read_student_results, version)
+
+def start_background_loads():
+    """Start loading the large student data without waiting for it
+
+    Returns {label: future}; the per-student results are skipped when the analysis
+    has not produced them.
+    """
+    loads = {'student index': submit_student_index(*student_index_source())}
+    version = data_version(['student_results'], RESULTS_DIR)
+    if version[0]:
+        loads['student results'] = submit_student_results(version)
+    return loads
+
+def wait_for_loads(loads):
+    """Show a progress bar until the background loads finish and return their results
+
+    A load that failed is forgotten so the next rerun retries it. A missing student
+    index stops the script; missing student results are returned as None.
+    """
+    pending = {future for future in loads.values() if not future.done()}
+    if pending:
+        progress = st.progress(0.0, text="Loading student data...")
+        while pending:
+            _, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+            remaining = [label for label, future in loads.items() if future in pending]
+            done = len(loads) - len(remaining)
+            progress.progress(done / len(loads),
+                              text=f"Loading {', '.join(remaining) or 'student data'}... "
+                                   f"({done}/{len(loads)} done)")
+        progress.empty()
+
+    results = {}
+    for label, future in loads.items():
+        error = future.exception()
+        if error is None:
+            results[label] = future.result()
+            continue
+        (submit_student_index if label == 'student index' else submit_student_results).clear()
+        if label == 'student index':
+            stop_on_student_index_error(error)
+        results[label] = None
+    return results
+
+@instrument(rows=None, level=logging.DEBUG)
+def search_student(index: StudentIndex, search_term: str):
+    """Search for a student and return the best match's details and marks"""
+    try:
+        logger.debug("Searching for %r among %d students", search_term, len(index))
         
-        if len(student) > 0:
-            # Get the first matching student
-            student_id = student.iloc[0]['student_id']
-            student_marks = marks_df[marks_df['student_id'] == student_id]
-            return student.head(1), student_marks
-            
-        return None, None
+        match = next(index.iter_matches(search_term), None)
+        if match is None:
+            return None, None
+        row, _ = match
+        return index.student(row), index.marks_for(row)
         
-    except Exception as e:
-        print(f"Search error: {str(e)}")
+    except Exception:
+        logger.exception("Search error for %r", search_term)
         return None, None
 
-def display_student_details(student: pd.DataFrame, marks: pd.DataFrame):
-    """Display student details and marks"""
+@instrument(rows=lambda found: len(found[0]), level=logging.DEBUG)
+def search_students(index: StudentIndex, search_term: str, page: int = 0, page_size: int = PAGE_SIZE):
+    """Return one page of ranked matches and whether another page follows
+
+    Only the matches up to the end of the requested page are computed, and only the
+    visible page is materialized as a DataFrame.
+    """
+    matches = list(islice(index.iter_matches(search_term),
+                          page * page_size, (page + 1) * page_size + 1))
+    has_more = len(matches) > page_size
+    matches = matches[:page_size]
+    
+    results = index.students.iloc[[row for row, _ in matches]][['student_id', 'name', 'age', 'batch']]
+    results = results.assign(match=[match for _, match in matches])
+    return results, has_more
+
+def change_search_page(step: int):
+    """Move the search results to the previous or next page"""
+    st.session_state.search_page += step
+
+def display_student_details(student: pd.DataFrame, marks: pd.DataFrame, summary: pd.Series = None):
+    """Display student details and marks
+
+    `summary` is the student's row from the precomputed student results, if available.
+    """
     try:
         # Student Information
         st.subheader("Student Information")
@@ -130,10 +292,20 @@ def display_student_details(student: pd.DataFrame, marks: pd.DataFrame):
         # Academic Performance
         st.subheader("Academic Performance")
         
-        # Calculate overall statistics
-        avg_marks = marks['marks'].mean()
-        total_subjects = len(marks)
-        passed_subjects = len(marks[marks['marks'] >= 40])
+        # Grade and pass with the policy the analysis used
+        policy = load_grading_policy()
+        marks = policy.apply(marks)
+        passed = policy.passed(marks['subject'], marks['marks'])
+        
+        # Overall statistics come from the analysis when available
+        if summary is not None:
+            avg_marks = summary['average_marks']
+            total_subjects = int(summary['total_subjects'])
+            passed_subjects = int(summary['subjects_passed'])
+        else:
+            avg_marks = marks['marks'].mean()
+            total_subjects = len(marks)
+            passed_subjects = int(passed.sum())
         
         # Display metrics
         col1, col2, col3 = st.columns(3)
@@ -145,6 +317,13 @@ def display_student_details(student: pd.DataFrame, marks: pd.DataFrame):
         with col3:
             st.metric("Pass Percentage", f"{(passed_subjects/total_subjects*100):.1f}%")
         
+        if summary is not None:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Overall Rank", f"{int(summary['overall_rank']):,}")
+            with col2:
+                st.metric("Percentile", f"{summary['percentile']:.1f}")
+        
         # Subject-wise Performance
         st.subheader("Subject-wise Marks")
         
@@ -162,7 +341,7 @@ def display_student_details(student: pd.DataFrame, marks: pd.DataFrame):
             y=marks['marks'],
             text=marks['grade'],
             textposition='auto',
-            marker_color=['red' if x < 40 else 'green' for x in marks['marks']]
+            marker_color=['green' if x else 'red' for x in passed]
         ))
         
         fig.update_layout(
@@ -216,6 +395,56 @@ def create_subject_performance_chart(subject_stats, subject_performance):
     
     return fig
 
+def create_marks_histogram_chart(subject_histogram, subject, pass_mark):
+    """Create marks distribution chart for one subject from the pre-binned histogram"""
+    histogram = subject_histogram[subject_histogram['subject'] == subject]
+    
+    fig = go.Figure(data=[go.Bar(
+        x=histogram['marks'],
+        y=histogram['count'],
+        marker_color=['#e74c3c' if x < pass_mark else '#3498db' for x in histogram['marks']]
+    )])
+    
+    fig.update_layout(
+        title=f'Marks Distribution - {subject}',
+        xaxis_title='Marks',
+        yaxis_title='Students',
+        bargap=0.05
+    )
+    
+    return fig
+
+def create_grade_pie_chart(grade_dist):
+    """Create the grade distribution pie chart of the analysis tab"""
+    return px.pie(
+        grade_dist,
+        values='count',
+        names='grade',
+        title='Grade Distribution',
+        hole=0.3
+    )
+
+def create_overall_tables(overall_stats, performance_metrics):
+    """Formatted overall performance metrics and mark statistics tables"""
+    metrics_df = pd.DataFrame({
+        'Metric': ['Pass Rate', 'Distinction Rate', 'Fail Rate'],
+        'Value': [
+            f"{performance_metrics['pass_percentage'].iloc[0]:.1f}%",
+            f"{performance_metrics['distinction_percentage'].iloc[0]:.1f}%",
+            f"{performance_metrics['fail_percentage'].iloc[0]:.1f}%"
+        ]
+    })
+    stats_df = pd.DataFrame({
+        'Metric': ['Average', 'Std Deviation', 'Minimum', 'Maximum'],
+        'Value': [
+            f"{overall_stats['average_marks'].iloc[0]:.2f}",
+            f"{overall_stats['std_deviation'].iloc[0]:.2f}",
+            f"{overall_stats['minimum_marks'].iloc[0]:.0f}",
+            f"{overall_stats['maximum_marks'].iloc[0]:.0f}"
+        ]
+    })
+    return metrics_df, stats_df
+
 def create_grade_distribution_chart(grade_dist):
     """Create grade distribution chart"""
     colors = ['#2ecc71', '#3498db', '#9b59b6', '#f1c40f', '#e67e22', '#e74c3c']
@@ -234,41 +463,123 @@ def create_grade_distribution_chart(grade_dist):
     
     return fig
 
+# Figures and formatted tables only change when the analysis reruns, so they are built
+# once per analysis version instead of on every rerun. They are shared between sessions
+# and must not be modified. Distribution charts use the pre-binned histogram tables.
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+@instrument(rows=None)
+def build_analysis_views(version):
+    """Figures and formatted tables of the analysis tab"""
+    overall_stats, subject_stats, grade_dist, performance_metrics, subject_performance = \
+        read_analysis_tables(version)
+
+    detailed_stats = subject_stats.merge(subject_performance, on='subject')
+    grade_stats = grade_dist.copy()
+    grade_stats['percentage'] = (grade_stats['count'] / grade_stats['count'].sum() * 100)
+    metrics_table, stats_table = create_overall_tables(overall_stats, performance_metrics)
+
+    return {
+        'subject_performance_chart': create_subject_performance_chart(subject_stats, subject_performance),
+        'subject_table': detailed_stats.style.format({
+            'average_marks': '{:.2f}',
+            'std_deviation': '{:.2f}',
+            'pass_percentage': '{:.1f}%',
+            'passed_students': '{:,}',
+            'failed_students': '{:,}'
+        }),
+        'grade_chart': create_grade_pie_chart(grade_dist),
+        'grade_table': grade_stats.style.format({
+            'count': '{:,}',
+            'percentage': '{:.1f}%'
+        }),
+        'metrics_table': metrics_table,
+        'stats_table': stats_table
+    }
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+@instrument(rows=None)
+def build_distribution_views(version, policy_version):
+    """Per-subject histogram figures and the formatted percentile table"""
+    subject_histogram, subject_percentiles = read_distribution_tables(version)
+    policy = read_grading_policy(policy_version)
+    return {
+        'histogram_charts': {
+            subject: create_marks_histogram_chart(subject_histogram, subject,
+                                                  policy.pass_mark_for(subject))
+            for subject in subject_histogram['subject'].unique()
+        },
+        'percentile_table': subject_percentiles.style.format({
+            column: '{:.0f}' for column in subject_percentiles.columns if column != 'subject'
+        })
+    }
+
+def display_performance_panel():
+    """Recent stage timings, rows and peak memory of this dashboard process"""
+    with st.expander("⏱️ Performance", expanded=True):
+        events = list(RECENT_EVENTS)[-PERFORMANCE_EVENTS:][::-1]
+        if not events:
+            st.info("No stages recorded yet.")
+            return
+
+        rss = peak_rss_mb()
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Peak Memory (RSS)", f"{rss:,.0f} MB" if rss is not None else "n/a")
+        with col2:
+            st.metric("Stages Recorded", len(RECENT_EVENTS))
+
+        columns = ['stage', 'seconds', 'rows', 'rows_per_sec', 'peak_rss_mb']
+        events_df = pd.DataFrame(events).reindex(columns=columns)
+        st.dataframe(events_df, hide_index=True, use_container_width=True)
+
+def configure_page():
+    """Page configuration and styles; must run before any other Streamlit call"""
+    # Set page configuration
+    st.set_page_config(
+        page_title="Student Result Management System",
+        page_icon="📊",
+        layout="wide"
+    )
+
+    # Custom CSS
+    st.markdown("""
+    <style>
+    .main {
+        padding: 0rem 0rem;
+    }
+    .st-emotion-cache-18ni7ap {
+        background-color: #f0f2f6;
+        border-radius: 10px;
+        padding: 20px;
+        margin: 10px 0px;
+    }
+    .metric-card {
+        background-color: white;
+        padding: 20px;
+        border-radius: 10px;
+        box-shadow: 2px 2px 10px rgba(0,0,0,0.1);
+    }
+    </style>
+    """, unsafe_allow_html=True)
+
 def main():
-    # Load all data
+    configure_page()
+    configure_logging()
+    show_performance = st.sidebar.checkbox("Show performance panel", value=False)
+
+    # Large student data loads in the background while the analysis renders; the
+    # small analysis tables are read concurrently and shown as soon as they are ready
+    background_loads = start_background_loads()
     overall_stats, subject_stats, grade_dist, performance_metrics, subject_performance = load_data()
-    students_df, marks_df = load_student_data()
     
     # Header
     st.title("📊 Student Result Management System")
     
     # Create tabs
-    tab1, tab2 = st.tabs(["🔍 Student Search", "📈 Overall Analysis"])
+    search_tab, analysis_tab = st.tabs(["🔍 Student Search", "📈 Overall Analysis"])
     
-    with tab1:
-        st.subheader("Student Search")
-        col1, col2 = st.columns([3, 1])
-        
-        with col1:
-            search_term = st.text_input(
-                "Enter Student ID or Name",
-                placeholder="e.g., STU00001 or John"
-            )
-        
-        with col2:
-            if st.button("Show Sample IDs"):
-                st.write(students_df['student_id'].head().tolist())
-        
-        if search_term:
-            student, student_marks = search_student(students_df, marks_df, search_term)
-            
-            if student is not None:
-                display_student_details(student, student_marks)
-            else:
-                st.warning(f"No student found matching: '{search_term}'")
-                st.info("Try using a complete Student ID (e.g., STU00001) or a name")
-    
-    with tab2:
+    with analysis_tab:
         st.write("Comprehensive Analysis of Student Results")
         # Key Metrics Row
         col1, col2, col3, col4 = st.columns(4)
@@ -302,57 +613,40 @@ def main():
             )
         
         # Performance Charts
+        views = load_analysis_views()
+        distribution_views = load_distribution_data()
         st.markdown("### 📈 Performance Analysis")
         
         tab1, tab2, tab3 = st.tabs(["Subject Analysis", "Grade Distribution", "Detailed Statistics"])
         
         with tab1:
             # Subject Performance Chart
-            fig = create_subject_performance_chart(subject_stats, subject_performance)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(views['subject_performance_chart'], use_container_width=True)
             
             # Subject-wise Statistics Table
             st.markdown("#### Subject-wise Detailed Statistics")
-            detailed_stats = subject_stats.merge(subject_performance, on='subject')
-            st.dataframe(
-                detailed_stats.style.format({
-                    'average_marks': '{:.2f}',
-                    'std_deviation': '{:.2f}',
-                    'pass_percentage': '{:.1f}%',
-                    'passed_students': '{:,}',
-                    'failed_students': '{:,}'
-                }),
-                hide_index=True,
-                use_container_width=True
-            )
+            st.dataframe(views['subject_table'], hide_index=True, use_container_width=True)
+            
+            if distribution_views is not None:
+                # Marks Distribution from the exact per-subject histograms
+                st.markdown("#### Marks Distribution")
+                histogram_charts = distribution_views['histogram_charts']
+                subject = st.selectbox("Subject", list(histogram_charts))
+                st.plotly_chart(histogram_charts[subject], use_container_width=True)
+                st.dataframe(distribution_views['percentile_table'], hide_index=True,
+                             use_container_width=True)
         
         with tab2:
             # Grade Distribution
             col1, col2 = st.columns(2)
             
             with col1:
-                fig = px.pie(
-                    grade_dist,
-                    values='count',
-                    names='grade',
-                    title='Grade Distribution',
-                    hole=0.3
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(views['grade_chart'], use_container_width=True)
             
             with col2:
                 # Grade Statistics
                 st.markdown("#### Grade-wise Statistics")
-                grade_stats = grade_dist.copy()
-                grade_stats['percentage'] = (grade_stats['count'] / grade_stats['count'].sum() * 100)
-                st.dataframe(
-                    grade_stats.style.format({
-                        'count': '{:,}',
-                        'percentage': '{:.1f}%'
-                    }),
-                    hide_index=True,
-                    use_container_width=True
-                )
+                st.dataframe(views['grade_table'], hide_index=True, use_container_width=True)
         
         with tab3:
             # Detailed Statistics
@@ -360,27 +654,75 @@ def main():
             col1, col2 = st.columns(2)
             
             with col1:
-                metrics_df = pd.DataFrame({
-                    'Metric': ['Pass Rate', 'Distinction Rate', 'Fail Rate'],
-                    'Value': [
-                        f"{performance_metrics['pass_percentage'].iloc[0]:.1f}%",
-                        f"{performance_metrics['distinction_percentage'].iloc[0]:.1f}%",
-                        f"{performance_metrics['fail_percentage'].iloc[0]:.1f}%"
-                    ]
-                })
-                st.dataframe(metrics_df, hide_index=True, use_container_width=True)
+                st.dataframe(views['metrics_table'], hide_index=True, use_container_width=True)
             
             with col2:
-                stats_df = pd.DataFrame({
-                    'Metric': ['Average', 'Std Deviation', 'Minimum', 'Maximum'],
-                    'Value': [
-                        f"{overall_stats['average_marks'].iloc[0]:.2f}",
-                        f"{overall_stats['std_deviation'].iloc[0]:.2f}",
-                        f"{overall_stats['minimum_marks'].iloc[0]:.0f}",
-                        f"{overall_stats['maximum_marks'].iloc[0]:.0f}"
-                    ]
-                })
-                st.dataframe(stats_df, hide_index=True, use_container_width=True)
+                st.dataframe(views['stats_table'], hide_index=True, use_container_width=True)
+    
+    # Filled last: the search needs the student data still loading in the background
+    with search_tab:
+        st.subheader("Student Search")
+        loaded = wait_for_loads(background_loads)
+        student_index = loaded['student index']
+        student_results = loaded.get('student results')
+        col1, col2 = st.columns([3, 1])
+        
+        with col1:
+            search_term = st.text_input(
+                "Enter Student ID or Name",
+                placeholder="e.g., STU00001 or John"
+            )
+        
+        with col2:
+            if st.button("Show Sample IDs"):
+                st.write(student_index.students['student_id'].head().tolist())
+        
+        if search_term:
+            # Start from the first page whenever the search changes
+            if st.session_state.get('search_term') != search_term:
+                st.session_state.search_term = search_term
+                st.session_state.search_page = 0
+            page = st.session_state.search_page
+            results, has_more = search_students(student_index, search_term, page)
+            
+            if len(results) > 0:
+                selected = 0
+                if page > 0 or has_more or len(results) > 1:
+                    first = page * PAGE_SIZE + 1
+                    st.caption(f"Matches {first:,}-{first + len(results) - 1:,} "
+                               f"(select a row to open it)")
+                    event = st.dataframe(
+                        results,
+                        hide_index=True,
+                        use_container_width=True,
+                        on_select="rerun",
+                        selection_mode="single-row",
+                        key=f"search_results_{search_term}_{page}"
+                    )
+                    # A stale selection can outlive a shorter result page
+                    if event.selection.rows and event.selection.rows[0] < len(results):
+                        selected = event.selection.rows[0]
+                    
+                    col1, col2, _ = st.columns([1, 1, 4])
+                    with col1:
+                        st.button("◀ Previous", disabled=page == 0,
+                                  on_click=change_search_page, args=(-1,))
+                    with col2:
+                        st.button("Next ▶", disabled=not has_more,
+                                  on_click=change_search_page, args=(1,))
+                
+                student_id = results['student_id'].iloc[selected]
+                row = student_index.lookup_id(student_id)
+                summary = None
+                if student_results is not None and student_id in student_results.index:
+                    summary = student_results.loc[student_id]
+                display_student_details(student_index.student(row), student_index.marks_for(row), summary)
+            else:
+                st.warning(f"No student found matching: '{search_term}'")
+                st.info("Try using a complete Student ID (e.g., STU00001) or a name")
+    
+    if show_performance:
+        display_performance_panel()
     
     # Footer
     st.markdown("---")
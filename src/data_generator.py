@@ -1,10 +1,37 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 import pandas as pd
+import numpy as np
 import random
 from faker import Faker
+from grading import GRADE_BINS, GRADE_LABELS
+from instrumentation import configure_logging, instrument, timed
+from columnar_store import ColumnarMarksWriter, build_columnar_store, remove_columnar_store
+from marks_store import MarksByStudentWriter, build_marks_by_student, remove_marks_by_student
+from storage import DEFAULT_FORMAT, FORMATS, TableWriter, remove_table, table_path, write_table
+from validation import validate_data
 
 # Initialize Faker for generating names
 fake = Faker()
 
+# List of 6 general subjects as specified
+SUBJECTS = ['Electronics', 'Programming', 'Database',
+            'Data_Science', 'Mathematics', 'DSA']
+BATCHES = ['2023', '2024', '2025', '2026']
+
+# Size of the first/last name pools sampled from Faker for the vectorized engine
+NAME_POOL_SIZE = 1000
+
+def assign_grades(marks):
+    """Map marks to grades using the default grading policy's boundaries"""
+    return pd.cut(marks, bins=GRADE_BINS, labels=GRADE_LABELS, right=False)
+
+@instrument()
 def generate_student_profiles(num_students=10000):  # Changed to 10000 students
     """Generate random student profiles"""
     students = []
@@ -14,22 +41,19 @@ def generate_student_profiles(num_students=10000):  # Changed to 10000 students
             'student_id': f'STU{str(student_id).zfill(5)}',  # STU00001 format
             'name': fake.name(),
             'age': random.randint(18, 25),
-            'batch': random.choice(['2023', '2024', '2025', '2026'])
+            'batch': random.choice(BATCHES)
         }
         students.append(student)
     
     return pd.DataFrame(students)
 
+@instrument()
 def generate_marks(students_df):
     """Generate marks for each student in each subject"""
-    # List of 6 general subjects as specified
-    subjects = ['Electronics', 'Programming', 'Database', 
-                'Data_Science', 'Mathematics', 'DSA']
-    
     all_marks = []
     
     for _, student in students_df.iterrows():
-        for subject in subjects:
+        for subject in SUBJECTS:
             mark = {
                 'student_id': student['student_id'],
                 'subject': subject,
@@ -40,56 +64,291 @@ def generate_marks(students_df):
     marks_df = pd.DataFrame(all_marks)
     
     # Add grades
-    marks_df['grade'] = marks_df['marks'].apply(lambda x: 
-        'A+' if x >= 90 else
-        'A' if x >= 80 else
-        'B' if x >= 70 else
-        'C' if x >= 60 else
-        'D' if x >= 50 else 'F'
-    )
+    marks_df['grade'] = assign_grades(marks_df['marks']).astype(str)
     
     return marks_df
 
-def main():
-    print("Generating student data...")
-    # Generate student profiles
-    students_df = generate_student_profiles()
-    
-    print("Generating marks data...")
-    # Generate marks
-    marks_df = generate_marks(students_df)
-    
-    # Save to CSV files
-    students_df.to_csv('data/students.csv', index=False)
-    marks_df.to_csv('data/marks.csv', index=False)
-    
+def build_name_pool(seed=42, pool_size=NAME_POOL_SIZE):
+    """Pre-sample first and last names from a seeded Faker instance"""
+    pool_fake = Faker()
+    pool_fake.seed_instance(seed)
+    first_names = np.array([pool_fake.first_name() for _ in range(pool_size)], dtype=object)
+    last_names = np.array([pool_fake.last_name() for _ in range(pool_size)], dtype=object)
+    return first_names, last_names
+
+def format_student_ids(numbers):
+    """Format integer student numbers as STU00001 style IDs"""
+    return np.char.add('STU', np.char.zfill(numbers.astype(str), 5)).astype(object)
+
+@instrument(level=logging.DEBUG)
+def generate_student_profiles_fast(num_students=10000, seed=42, name_pool=None, start_id=1):
+    """Generate student profiles with vectorized NumPy sampling
+
+    `seed` may also be a numpy Generator so batches can share one random stream.
+    """
+    rng = np.random.default_rng(seed)
+    first_names, last_names = name_pool if name_pool is not None else build_name_pool(seed)
+
+    numbers = np.arange(start_id, start_id + num_students)
+    first = first_names[rng.integers(0, len(first_names), num_students)]
+    last = last_names[rng.integers(0, len(last_names), num_students)]
+
+    return pd.DataFrame({
+        'student_id': format_student_ids(numbers),
+        'name': first + ' ' + last,
+        'age': rng.integers(18, 26, num_students),
+        'batch': np.array(BATCHES, dtype=object)[rng.integers(0, len(BATCHES), num_students)]
+    })
+
+@instrument(level=logging.DEBUG)
+def generate_marks_fast(students_df, seed=42):
+    """Generate marks for every student and subject with vectorized NumPy sampling"""
+    rng = np.random.default_rng(seed)
+    num_students = len(students_df)
+    num_subjects = len(SUBJECTS)
+
+    marks = rng.integers(0, 101, num_students * num_subjects)
+
+    return pd.DataFrame({
+        'student_id': np.repeat(students_df['student_id'].to_numpy(), num_subjects),
+        'subject': pd.Categorical.from_codes(np.tile(np.arange(num_subjects), num_students), SUBJECTS),
+        'marks': marks,
+        'grade': assign_grades(marks)
+    })
+
+def generate_batches(num_students, batch_size=100000, seed=42, start_id=1, name_pool_seed=None):
+    """Yield (students, marks) DataFrames for fixed-size batches of students"""
+    name_pool = build_name_pool(seed if name_pool_seed is None else name_pool_seed)
+    profile_rng = np.random.default_rng(seed)
+    marks_rng = np.random.default_rng(seed + 1)
+
+    end_id = start_id + num_students
+    for batch_start in range(start_id, end_id, batch_size):
+        batch_students = min(batch_size, end_id - batch_start)
+        students_df = generate_student_profiles_fast(
+            batch_students, seed=profile_rng, name_pool=name_pool, start_id=batch_start
+        )
+        yield students_df, generate_marks_fast(students_df, seed=marks_rng)
+
+@instrument('generate_streaming', rows=lambda written: written['num_marks'])
+def write_streaming(num_students=10000, batch_size=100000, seed=42, fmt=DEFAULT_FORMAT,
+                    students_path=None, marks_path=None, part_prefix='part', clear=True,
+                    start_id=1, name_pool_seed=None, report=True, marks_by_student=False,
+                    columnar=False):
+    """Generate data batch by batch, appending each batch to the students and marks tables
+
+    With `marks_by_student`, marks are also written to the marks-by-student file used
+    for lazy loading (students are generated in order, so their marks arrive grouped).
+    With `columnar`, marks are also written to the memory-mapped columnar store.
+    """
+    total_students = 0
+    total_marks = 0
+    start_time = time.perf_counter()
+
+    with TableWriter('students', fmt, path=students_path, part_prefix=part_prefix,
+                     clear=clear) as students_writer, \
+            TableWriter('marks', fmt, path=marks_path, part_prefix=part_prefix,
+                        clear=clear) as marks_writer, \
+            (MarksByStudentWriter() if marks_by_student else nullcontext()) as by_student_writer, \
+            (ColumnarMarksWriter(SUBJECTS, GRADE_BINS, GRADE_LABELS) if columnar
+             else nullcontext()) as columnar_writer:
+        for students_df, marks_df in generate_batches(num_students, batch_size, seed,
+                                                      start_id, name_pool_seed):
+            students_writer.write(students_df)
+            marks_writer.write(marks_df)
+            if by_student_writer is not None:
+                by_student_writer.write(marks_df)
+            if columnar_writer is not None:
+                columnar_writer.write(marks_df)
+
+            total_students += len(students_df)
+            total_marks += len(marks_df)
+            if not report:
+                continue
+            elapsed = time.perf_counter() - start_time
+            print(f"  {total_students:,} students / {total_marks:,} marks written "
+                  f"({total_marks / elapsed:,.0f} mark rows/sec)")
+
+    return {
+        'num_students': total_students,
+        'num_marks': total_marks,
+        'students': students_writer.files,
+        'marks': marks_writer.files
+    }
+
+def shard_ranges(num_students, num_shards):
+    """Split the student number range into contiguous (start_id, count) shards"""
+    base, extra = divmod(num_students, num_shards)
+    ranges = []
+    start_id = 1
+    for shard in range(num_shards):
+        count = base + (1 if shard < extra else 0)
+        ranges.append((start_id, count))
+        start_id += count
+    return ranges
+
+def generate_shard(shard, start_id, count, shard_seed, base_seed, batch_size, fmt, out_dir):
+    """Generate one shard of the student range into its own part files"""
+    if fmt == 'csv':
+        students_path = os.path.join(out_dir, f'students-part-{shard:05d}.csv')
+        marks_path = os.path.join(out_dir, f'marks-part-{shard:05d}.csv')
+    else:
+        # Parquet shards add their part files to the shared dataset directories
+        students_path = marks_path = None
+    # The name pool comes from the base seed so every shard draws from the same names
+    written = write_streaming(
+        count, batch_size, shard_seed, fmt, students_path, marks_path,
+        part_prefix=f'shard{shard:05d}', clear=False,
+        start_id=start_id, name_pool_seed=base_seed, report=False
+    )
+    return {
+        'shard': shard,
+        'first_student_id': int(start_id),
+        'num_students': written['num_students'],
+        'num_marks': written['num_marks'],
+        # Part files are listed relative to the manifest directory
+        'students': sorted(os.path.relpath(path, out_dir) for path in written['students']),
+        'marks': sorted(os.path.relpath(path, out_dir) for path in written['marks'])
+    }
+
+@instrument('generate_sharded', rows=lambda manifest: manifest['num_marks'])
+def write_sharded(num_students=10000, num_shards=4, seed=42, batch_size=100000,
+                  fmt=DEFAULT_FORMAT, out_dir='data/parts', workers=None):
+    """Generate shards in a process pool and write a manifest listing the part files
+
+    Each shard's seed is derived from `seed` with SeedSequence.spawn, so the
+    output is identical for a given seed and shard count regardless of workers.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    # Single-file tables would shadow the parts, and Parquet shards append to the datasets
+    for name in ['students', 'marks']:
+        remove_table(table_path(name, fmt))
+    shard_seeds = [int(child.generate_state(1)[0])
+                   for child in np.random.SeedSequence(seed).spawn(num_shards)]
+    ranges = shard_ranges(num_students, num_shards)
+
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(generate_shard, shard, start_id, count, shard_seeds[shard],
+                            seed, batch_size, fmt, out_dir)
+            for shard, (start_id, count) in enumerate(ranges)
+        ]
+        parts = []
+        for future in futures:
+            part = future.result()
+            parts.append(part)
+            print(f"  Shard {part['shard']} done: {part['num_marks']:,} mark rows")
+    elapsed = time.perf_counter() - start_time
+
+    manifest = {
+        'seed': seed,
+        'format': fmt,
+        'num_shards': num_shards,
+        'num_students': sum(part['num_students'] for part in parts),
+        'num_marks': sum(part['num_marks'] for part in parts),
+        'parts': parts
+    }
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"  {manifest['num_marks']:,} mark rows in {elapsed:.1f}s "
+          f"({manifest['num_marks'] / elapsed:,.0f} mark rows/sec)")
+    return manifest
+
+def main(num_students=10000, engine='vectorized', seed=42, batch_size=None,
+         shards=None, workers=None, fmt=DEFAULT_FORMAT, marks_by_student=False,
+         columnar=False):
+    # An old marks-by-student file or columnar store would no longer match the new marks
+    remove_marks_by_student()
+    remove_columnar_store()
+
+    if shards:
+        print(f"Generating {shards} shards with a process pool...")
+        manifest = write_sharded(num_students, shards, seed, batch_size or 100000, fmt,
+                                 workers=workers)
+        if marks_by_student:
+            print("Building marks-by-student file...")
+            build_marks_by_student(fmt)
+        if columnar:
+            print("Building columnar marks store...")
+            build_columnar_store(SUBJECTS, GRADE_BINS, GRADE_LABELS, fmt)
+        print(f"Generated data for {manifest['num_students']} students")
+        print(f"Generated {manifest['num_marks']} mark entries")
+        print("Data generation completed!")
+        return
+
+    if batch_size:
+        print(f"Streaming student data in batches of {batch_size:,}...")
+        written = write_streaming(num_students, batch_size, seed, fmt,
+                                  marks_by_student=marks_by_student, columnar=columnar)
+        print(f"Generated data for {written['num_students']} students")
+        print(f"Generated {written['num_marks']} mark entries")
+        print("Data generation completed!")
+        return
+
+    print(f"Generating student data ({engine} engine)...")
+    if engine == 'vectorized':
+        # Separate seeds so marks do not correlate with profile draws
+        with timed('generate_vectorized') as metrics:
+            students_df = generate_student_profiles_fast(num_students, seed=seed)
+            print("Generating marks data...")
+            marks_df = generate_marks_fast(students_df, seed=seed + 1)
+            metrics['rows'] = len(marks_df)
+    else:
+        random.seed(seed)
+        Faker.seed(seed)
+        # Generate student profiles
+        students_df = generate_student_profiles(num_students)
+
+        print("Generating marks data...")
+        # Generate marks
+        marks_df = generate_marks(students_df)
+
+    # Save the tables in the selected storage format
+    with timed('write_tables', rows=len(marks_df), format=fmt):
+        write_table(students_df, 'students', fmt)
+        write_table(marks_df, 'marks', fmt)
+        if marks_by_student:
+            with MarksByStudentWriter() as writer:
+                writer.write(marks_df)
+        if columnar:
+            with ColumnarMarksWriter(SUBJECTS, GRADE_BINS, GRADE_LABELS) as writer:
+                writer.write(marks_df)
+
     print(f"Generated data for {len(students_df)} students")
     print(f"Generated {len(marks_df)} mark entries")
     print("Data generation completed!")
 
-def verify_generated_data():
-    """Verify the generated data"""
-    try:
-        students_df = pd.read_csv('data/students.csv')
-        marks_df = pd.read_csv('data/marks.csv')
-        
-        print("\nVerification Results:")
-        print(f"Number of students: {len(students_df)}")
-        print(f"Number of mark entries: {len(marks_df)}")
-        print("\nStudent ID format sample:", students_df['student_id'].iloc[0])
-        print("Student columns:", students_df.columns.tolist())
-        print("Marks columns:", marks_df.columns.tolist())
-        
-        # Verify each student has marks
-        students_with_marks = marks_df['student_id'].nunique()
-        print(f"\nStudents with marks: {students_with_marks}")
-        
-        if students_with_marks != len(students_df):
-            print("Warning: Not all students have marks!")
-            
-    except Exception as e:
-        print(f"Error during verification: {e}")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate student profiles and marks")
+    parser.add_argument('--students', type=int, default=10000, help="Number of students")
+    parser.add_argument('--engine', choices=['vectorized', 'faker'], default='vectorized',
+                        help="Vectorized NumPy engine or the original per-row Faker engine")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help="Stream students in batches of this size to keep memory flat")
+    parser.add_argument('--shards', type=int, default=None,
+                        help="Split students into this many part files under data/parts")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processes used for sharded generation (default: all cores)")
+    parser.add_argument('--format', choices=FORMATS, default=DEFAULT_FORMAT,
+                        help="Storage format for data/ (default: RMS_STORAGE_FORMAT or csv)")
+    parser.add_argument('--marks-by-student', action='store_true',
+                        help="Also write marks grouped by student for lazy dashboard loading")
+    parser.add_argument('--columnar', action='store_true',
+                        help="Also write the memory-mapped columnar marks store (6 bytes per mark)")
+    parser.add_argument('--skip-validation', action='store_true',
+                        help="Do not validate the generated tables (an extra pass over the data)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
-    verify_generated_data() 
\ No newline at end of file
+    args = parse_args()
+    configure_logging()
+    main(args.students, engine=args.engine, seed=args.seed, batch_size=args.batch_size,
+         shards=args.shards, workers=args.workers, fmt=args.format,
+         marks_by_student=args.marks_by_student, columnar=args.columnar)
+    # Validation streams the tables with bounded memory, so it also runs for streamed or
+    # sharded datasets
+    if not args.skip_validation:
+        validate_data(args.format)
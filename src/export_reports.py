@@ -0,0 +1,243 @@
+import argparse
+import csv
+import html
+import io
+import json
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from grading import analysis_policy
+from instrumentation import configure_logging, timed
+from storage import DEFAULT_FORMAT, FORMATS, iter_file_chunks, table_files
+
+REPORT_FORMATS = ['csv', 'json', 'html']
+
+# Students rendered per worker task
+CHUNK_STUDENTS = 1000
+
+STUDENT_COLUMNS = ['student_id', 'name', 'age', 'batch']
+MARKS_COLUMNS = ['student_id', 'subject', 'marks', 'grade']
+
+def read_batch_students(batch, fmt=DEFAULT_FORMAT):
+    """Profiles of every student in a batch, streamed from the students table
+
+    IDs and batches are strings, as the API serves them, whatever the storage format.
+    A duplicated student ID keeps its first profile, as `validation.py --repair` does.
+    """
+    files = table_files('students', fmt)
+    if not files:
+        raise FileNotFoundError("No student data found. Please run data generation first!")
+    chunks = []
+    for chunk in iter_file_chunks(files, fmt, STUDENT_COLUMNS):
+        chunk = chunk.astype({'student_id': str, 'batch': str})
+        chunks.append(chunk[chunk['batch'] == str(batch)])
+    students = pd.concat(chunks, ignore_index=True)
+    return students.drop_duplicates('student_id', keep='first', ignore_index=True)
+
+def group_batch_marks(student_ids, fmt=DEFAULT_FORMAT):
+    """Marks of the given students grouped by student in one pass over the marks table
+
+    Returns the marks ordered like `student_ids` and the offsets of each student's rows.
+    """
+    files = table_files('marks', fmt)
+    if not files:
+        raise FileNotFoundError("No marks data found. Please run data generation first!")
+    positions = pd.Index(student_ids)
+    chunks = []
+    for chunk in iter_file_chunks(files, fmt, MARKS_COLUMNS):
+        codes = positions.get_indexer(chunk['student_id'].astype(str))
+        chunks.append(chunk[codes >= 0].assign(_position=codes[codes >= 0]))
+
+    batch_marks = pd.concat(chunks, ignore_index=True)
+    codes = batch_marks.pop('_position').to_numpy(dtype=np.int64)
+    # Stable sort keeps each student's marks in file order
+    order = np.argsort(codes, kind='stable')
+    batch_marks = batch_marks.iloc[order].reset_index(drop=True)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(student_ids)))])
+    return batch_marks, offsets
+
+def student_summary(marks, passed):
+    """Average, subjects passed and total subjects of one student's marks"""
+    scores = [row['marks'] for row in marks if row['marks'] is not None]
+    return {
+        'average_marks': round(sum(scores) / len(scores), 2) if scores else None,
+        'subjects_passed': sum(passed),
+        'total_subjects': len(marks)
+    }
+
+def render_csv(student, marks, summary):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(['student_id', 'name', 'batch', 'subject', 'marks', 'grade'])
+    for row in marks:
+        writer.writerow([student['student_id'], student['name'], student['batch'],
+                         row['subject'], row['marks'], row['grade']])
+    return buffer.getvalue()
+
+def render_json(student, marks, summary):
+    return json.dumps({**student, **summary, 'marks': marks}, indent=2, default=str)
+
+def render_html(student, marks, summary):
+    rows = '\n'.join(
+        f"<tr><td>{html.escape(str(row['subject']))}</td><td>{row['marks']}</td>"
+        f"<td>{html.escape(str(row['grade']))}</td></tr>"
+        for row in marks
+    )
+    average = summary['average_marks']
+    return f"""<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Result Sheet - {html.escape(student['student_id'])}</title></head>
+<body>
+<h1>Result Sheet</h1>
+<p><b>Student ID:</b> {html.escape(student['student_id'])}<br>
+<b>Name:</b> {html.escape(str(student['name']))}<br>
+<b>Age:</b> {student['age']}<br>
+<b>Batch:</b> {html.escape(str(student['batch']))}</p>
+<p><b>Average Marks:</b> {'' if average is None else f'{average:.2f}'}<br>
+<b>Subjects Passed:</b> {summary['subjects_passed']}/{summary['total_subjects']}</p>
+<table border="1" cellpadding="4">
+<tr><th>Subject</th><th>Marks</th><th>Grade</th></tr>
+{rows}
+</table>
+</body>
+</html>
+"""
+
+RENDERERS = {
+    'csv': render_csv,
+    'json': render_json,
+    'html': render_html
+}
+
+def render_reports(students, marks, offsets, report_format, policy):
+    """Render one chunk of students to [(file name, bytes)] (runs in a worker process)
+
+    Grades are recomputed under `policy`. The chunk is converted to plain Python rows
+    once; per-student pandas slicing would cost more than the rendering itself.
+    """
+    render = RENDERERS[report_format]
+    scores = pd.to_numeric(marks['marks'])
+    columns = policy.apply(marks[['subject', 'marks']].assign(marks=scores))
+    passed = policy.passed(columns['subject'], scores).tolist()
+    rows = columns.astype(object).where(columns.notna(), None).to_dict('records')
+    reports = []
+    for position, student in enumerate(students.to_dict('records')):
+        first, last = offsets[position], offsets[position + 1]
+        student_marks = rows[first:last]
+        summary = student_summary(student_marks, passed[first:last])
+        content = render(student, student_marks, summary)
+        reports.append((f"{student['student_id']}.{report_format}", content.encode('utf-8')))
+    return reports
+
+def iter_tasks(students, marks, offsets, chunk_students):
+    """(students, marks, offsets) per chunk, with offsets rebased to the chunk's marks"""
+    for start in range(0, len(students), chunk_students):
+        end = min(start + chunk_students, len(students))
+        first, last = offsets[start], offsets[end]
+        yield (students.iloc[start:end], marks.iloc[first:last],
+               offsets[start:end + 1] - first)
+
+class ReportSink:
+    """Write reports into a zip archive (output ending in .zip) or a directory"""
+
+    def __init__(self, output):
+        self.is_zip = output.endswith('.zip')
+        self.output = output
+        os.makedirs((os.path.dirname(output) or '.') if self.is_zip else output, exist_ok=True)
+        self.archive = zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) if self.is_zip else None
+        self.bytes_written = 0
+
+    def write(self, name, content):
+        if self.archive is not None:
+            self.archive.writestr(name, content)
+        else:
+            with open(os.path.join(self.output, name), 'wb') as f:
+                f.write(content)
+        self.bytes_written += len(content)
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def export_batch(batch, output, report_format='html', fmt=DEFAULT_FORMAT, workers=None,
+                 chunk_students=CHUNK_STUDENTS, policy=None):
+    """Export a result sheet for every student in a batch
+
+    Students and their marks are grouped in one pass, rendered in chunks across a
+    process pool, and streamed to the output as chunks complete. At most two chunks
+    per worker are in flight, so memory does not grow with the number of reports.
+    Reports are graded with `policy` (default: the policy of the last analysis).
+    """
+    start_time = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    policy = policy or analysis_policy()
+    with timed('read_batch', batch=str(batch)) as metrics:
+        students = read_batch_students(batch, fmt)
+        if students.empty:
+            raise ValueError(f"No students found in batch {batch}")
+        marks, offsets = group_batch_marks(students['student_id'].astype(str).to_numpy(), fmt)
+        metrics['rows'] = len(marks)
+    print(f"Exporting {len(students):,} {report_format.upper()} reports for batch {batch} "
+          f"with {workers} workers...")
+
+    exported = 0
+    with timed('render_reports', format=report_format, workers=workers) as metrics, \
+            ReportSink(output) as sink, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        tasks = iter_tasks(students, marks, offsets, chunk_students)
+        for task in tasks:
+            pending.append(executor.submit(render_reports, *task, report_format, policy))
+            if len(pending) < 2 * workers:
+                continue
+            reports = pending.popleft().result()
+            for name, content in reports:
+                sink.write(name, content)
+            exported += len(reports)
+            elapsed = time.perf_counter() - start_time
+            print(f"  {exported:,} reports written ({exported / elapsed:,.0f} reports/sec)")
+        for future in pending:
+            reports = future.result()
+            for name, content in reports:
+                sink.write(name, content)
+            exported += len(reports)
+        metrics['rows'] = exported
+        metrics['bytes'] = sink.bytes_written
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Exported {exported:,} reports ({sink.bytes_written / 1024 ** 2:,.1f} MB) "
+          f"to {output} in {elapsed:.1f}s ({exported / elapsed:,.0f} reports/sec)")
+    return {'reports': exported, 'bytes': sink.bytes_written, 'seconds': elapsed}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export per-student result sheets for a batch")
+    parser.add_argument('--batch', required=True, help="Batch to export, e.g. 2025")
+    parser.add_argument('--report-format', choices=REPORT_FORMATS, default='html',
+                        help="Format of each result sheet")
+    parser.add_argument('--output', default=None,
+                        help="Zip file (ending in .zip) or directory "
+                             "(default: reports/<batch>-<report format>.zip)")
+    parser.add_argument('--format', choices=FORMATS, default=DEFAULT_FORMAT,
+                        help="Storage format of data/ (default: RMS_STORAGE_FORMAT or csv)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processes used for rendering (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_STUDENTS,
+                        help="Students rendered per worker task")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_logging()
+    output = args.output or os.path.join('reports', f'{args.batch}-{args.report_format}.zip')
+    export_batch(args.batch, output, args.report_format, args.format, args.workers,
+                 args.chunk_size)
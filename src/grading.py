@@ -0,0 +1,189 @@
+import json
+import os
+import numpy as np
+from storage import RESULTS_DIR
+
+# Grade boundaries: marks in [GRADE_BINS[i], GRADE_BINS[i+1]) get GRADE_LABELS[i]
+GRADE_BINS = [0, 50, 60, 70, 80, 90, 101]
+GRADE_LABELS = ['F', 'D', 'C', 'B', 'A', 'A+']
+PASS_MARK = 40
+DISTINCTION_GRADE = 'A+'
+
+# Policy file used when none is given (the default policy is the one data is generated with)
+POLICY_PATH = os.environ.get('RMS_GRADING_POLICY')
+
+# Policy the last analysis ran with, with curves resolved to cutoffs; the dashboard,
+# report export and API grade with it so they agree with the analysis results
+ANALYSIS_POLICY_PATH = os.path.join(RESULTS_DIR, 'grading_policy.json')
+
+def check_bins(grade_bins, grade_labels, what):
+    """Raise ValueError unless the boundaries fit the labels and never decrease"""
+    if len(grade_bins) != len(grade_labels) + 1:
+        raise ValueError(f"{what} needs one more boundary than grade labels")
+    if any(low > high for low, high in zip(grade_bins[:-1], grade_bins[1:])):
+        raise ValueError(f"{what} must be non-decreasing")
+
+class GradingPolicy:
+    """Grade boundaries, pass marks and distinction grade applied at analysis time
+
+    Subjects can override the boundaries and pass mark. With a `curve`, grades are
+    relative instead: curve[i] is the percentile of a subject's marks where grade i
+    starts, and resolve() turns it into per-subject boundaries from the marks
+    histogram. Pass marks are always absolute.
+    """
+
+    def __init__(self, grade_bins=GRADE_BINS, grade_labels=GRADE_LABELS, pass_mark=PASS_MARK,
+                 distinction_grade=DISTINCTION_GRADE, subjects=None, curve=None, name='default'):
+        self.name = name
+        self.grade_bins = list(grade_bins)
+        self.grade_labels = list(grade_labels)
+        self.pass_mark = pass_mark
+        self.distinction_grade = distinction_grade
+        self.subjects = {subject: dict(override) for subject, override in (subjects or {}).items()}
+        self.curve = list(curve) if curve else None
+
+        check_bins(self.grade_bins, self.grade_labels, "grade_bins")
+        for subject, override in self.subjects.items():
+            if 'grade_bins' in override:
+                check_bins(override['grade_bins'], self.grade_labels, f"grade_bins of {subject}")
+        if self.curve is not None and (len(self.curve) != len(self.grade_labels)
+                                       or self.curve[0] != 0 or sorted(self.curve) != self.curve
+                                       or self.curve[-1] > 100):
+            raise ValueError("curve needs one non-decreasing percentile (0-100) per grade, "
+                             "starting at 0")
+        if distinction_grade not in self.grade_labels:
+            raise ValueError(f"distinction_grade {distinction_grade!r} is not a grade label")
+
+    def bins_for(self, subject):
+        """Grade boundaries of a subject"""
+        return self.subjects.get(subject, {}).get('grade_bins', self.grade_bins)
+
+    def pass_mark_for(self, subject):
+        """Pass mark of a subject"""
+        return self.subjects.get(subject, {}).get('pass_mark', self.pass_mark)
+
+    def grade_codes(self, subjects, marks):
+        """Index into grade_labels of each mark, -1 where it is missing or out of range"""
+        subjects = np.asarray(subjects).astype(str)
+        marks = np.asarray(marks, dtype=float)
+        codes = np.searchsorted(self.grade_bins, marks, side='right') - 1
+        for subject, override in self.subjects.items():
+            if 'grade_bins' in override:
+                in_subject = subjects == subject
+                codes[in_subject] = np.searchsorted(override['grade_bins'], marks[in_subject],
+                                                    side='right') - 1
+        # NaN sorts past the last boundary, like marks above the top grade
+        codes[codes >= len(self.grade_labels)] = -1
+        return codes
+
+    def grades(self, subjects, marks):
+        """Grade of each mark (None where it is missing or out of range)"""
+        labels = np.array(self.grade_labels + [None], dtype=object)
+        return labels[self.grade_codes(subjects, marks)]
+
+    def passed(self, subjects, marks):
+        """Whether each mark reaches its subject's pass mark"""
+        subjects = np.asarray(subjects).astype(str)
+        thresholds = np.full(len(subjects), self.pass_mark, dtype=float)
+        for subject, override in self.subjects.items():
+            if 'pass_mark' in override:
+                thresholds[subjects == subject] = override['pass_mark']
+        return np.asarray(marks, dtype=float) >= thresholds
+
+    def apply(self, marks_df):
+        """Marks DataFrame with its grades recomputed under this policy"""
+        return marks_df.assign(grade=self.grades(marks_df['subject'], marks_df['marks']))
+
+    def spark_grade(self, marks, subject):
+        """Spark column with the grade of each mark, as one `when` chain"""
+        from pyspark.sql.functions import when
+
+        grade = None
+        overridden = [name for name, override in self.subjects.items() if 'grade_bins' in override]
+        chains = [(subject == name, self.subjects[name]['grade_bins']) for name in overridden]
+        # A null subject is not overridden, as in grade_codes (isin alone would be null)
+        default = (~subject.isin(overridden) | subject.isNull()) if overridden else None
+        chains.append((default, self.grade_bins))
+        for in_subject, grade_bins in chains:
+            for low, high, label in zip(grade_bins[:-1], grade_bins[1:], self.grade_labels):
+                in_bin = (marks >= low) & (marks < high)
+                if in_subject is not None:
+                    in_bin = in_subject & in_bin
+                grade = when(in_bin, label) if grade is None else grade.when(in_bin, label)
+        return grade
+
+    def spark_passed(self, marks, subject):
+        """Spark column that is true where a mark reaches its subject's pass mark"""
+        from pyspark.sql.functions import lit, when
+
+        threshold = lit(self.pass_mark)
+        for name, override in self.subjects.items():
+            if 'pass_mark' in override:
+                threshold = when(subject == name, override['pass_mark']).otherwise(threshold)
+        return marks >= threshold
+
+    def resolve(self, counts):
+        """Policy with the curve turned into per-subject boundaries
+
+        `counts` is a (subject, marks, count) table such as the analysis counts. Grade i
+        starts at the lowest mark with at least curve[i] percent of the subject's marks
+        below it. Policies without a curve are returned unchanged.
+        """
+        if self.curve is None:
+            return self
+        subjects = {name: dict(override) for name, override in self.subjects.items()}
+        valid = counts.dropna(subset=['marks'])
+        for subject, group in valid.groupby(valid['subject'].astype(str), sort=True):
+            histogram = group.groupby('marks')['count'].sum().sort_index()
+            values = histogram.index.to_numpy(dtype=float)
+            weights = histogram.to_numpy(dtype=float)
+            below = (np.cumsum(weights) - weights) / weights.sum() * 100
+            upper = self.bins_for(subject)[-1]
+            cutoffs = [values[position] if position < len(values) else upper
+                       for position in np.searchsorted(below, self.curve[1:], side='left')]
+            grade_bins = [self.bins_for(subject)[0], *cutoffs, upper]
+            subjects.setdefault(subject, {})['grade_bins'] = \
+                [float(edge) for edge in np.maximum.accumulate(grade_bins)]
+        return GradingPolicy(self.grade_bins, self.grade_labels, self.pass_mark,
+                             self.distinction_grade, subjects, name=self.name)
+
+    def to_dict(self):
+        policy = {
+            'name': self.name,
+            'grade_bins': self.grade_bins,
+            'grade_labels': self.grade_labels,
+            'pass_mark': self.pass_mark,
+            'distinction_grade': self.distinction_grade,
+            'subjects': self.subjects
+        }
+        if self.curve is not None:
+            policy['curve'] = self.curve
+        return policy
+
+    @classmethod
+    def from_dict(cls, policy):
+        return cls(policy.get('grade_bins', GRADE_BINS), policy.get('grade_labels', GRADE_LABELS),
+                   policy.get('pass_mark', PASS_MARK),
+                   policy.get('distinction_grade', DISTINCTION_GRADE),
+                   policy.get('subjects'), policy.get('curve'), policy.get('name', 'custom'))
+
+    def save(self, path=ANALYSIS_POLICY_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+DEFAULT_POLICY = GradingPolicy()
+
+def load_policy(path=None):
+    """Policy from a JSON file (default: RMS_GRADING_POLICY), or the default policy"""
+    path = path or POLICY_PATH
+    if not path:
+        return DEFAULT_POLICY
+    with open(path) as f:
+        return GradingPolicy.from_dict(json.load(f))
+
+def analysis_policy():
+    """Resolved policy of the last analysis run, or the default policy before any run"""
+    if not os.path.exists(ANALYSIS_POLICY_PATH):
+        return DEFAULT_POLICY
+    return load_policy(ANALYSIS_POLICY_PATH)
@@ -0,0 +1,116 @@
+import functools
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Log level for every entry point (DEBUG also shows per-batch stages and data dumps)
+LOG_LEVEL = os.environ.get('RMS_LOG_LEVEL', 'INFO').upper()
+
+logger = logging.getLogger('rms')
+
+# Most recent stage events of this process, shown in the dashboard's performance panel
+RECENT_EVENTS = deque(maxlen=500)
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per log record; stage events carry their metrics as fields"""
+
+    def format(self, record):
+        event = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        event.update(getattr(record, 'metrics', {}))
+        if record.exc_info:
+            event['exception'] = self.formatException(record.exc_info)
+        return json.dumps(event, default=str)
+
+def configure_logging(level=None):
+    """Send the 'rms' logger to stderr as JSON lines (idempotent)"""
+    logger.setLevel(level or LOG_LEVEL)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+        logger.propagate = False
+    return logger
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+@contextmanager
+def timed(stage, level=logging.INFO, **fields):
+    """Time a block and log it as a stage event
+
+    Yields a dict the block can add fields to; setting 'rows' also reports rows/sec.
+    The event is logged (and kept in RECENT_EVENTS) even if the block raises.
+    """
+    metrics = dict(fields)
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield metrics
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        event = {'stage': stage, 'seconds': round(seconds, 6), **metrics}
+        if metrics.get('rows') is not None and seconds > 0:
+            event['rows_per_sec'] = round(metrics['rows'] / seconds, 1)
+        event['peak_rss_mb'] = peak_rss_mb()
+        if failed:
+            event['failed'] = True
+        RECENT_EVENTS.append(event)
+        logger.log(level, stage, extra={'metrics': event})
+
+def instrument(stage=None, rows=len, level=logging.INFO):
+    """Decorator form of timed(); `rows(result)` counts the rows the call produced"""
+    def decorator(func):
+        name = stage or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(name, level) as metrics:
+                result = func(*args, **kwargs)
+                if rows is not None and result is not None:
+                    metrics['rows'] = int(rows(result))
+                return result
+        return wrapper
+    return decorator
+
+def spark_job_metrics(spark, group):
+    """Job and stage IDs that ran in a Spark job group, from the status tracker"""
+    tracker = spark.sparkContext.statusTracker()
+    job_ids = sorted(tracker.getJobIdsForGroup(group))
+    stage_ids = []
+    for job_id in job_ids:
+        info = tracker.getJobInfo(job_id)
+        if info is not None:
+            stage_ids.extend(info.stageIds)
+    return {'spark_job_group': group, 'spark_job_ids': job_ids,
+            'spark_stage_ids': sorted(stage_ids)}
+
+@contextmanager
+def spark_stage(spark, stage, level=logging.INFO, **fields):
+    """timed() for Spark work: runs the block in its own job group and logs its job/stage IDs"""
+    spark.sparkContext.setJobGroup(stage, stage)
+    with timed(stage, level, **fields) as metrics:
+        yield metrics
+        metrics.update(spark_job_metrics(spark, stage))
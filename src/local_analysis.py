@@ -0,0 +1,153 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from aggregates import (RESULT_TABLES, incremental_counts, label_strings, merge_counts,
+                        summarize_counts)
+from columnar_store import ColumnarMarks
+from grading import load_policy
+from instrumentation import configure_logging, timed
+from storage import (DEFAULT_FORMAT, FORMATS, RESULTS_DIR, files_size, iter_file_chunks,
+                     table_files, write_table)
+
+# Rows read at a time, so memory stays bounded whatever the size of the marks table
+CHUNK_ROWS = 1_000_000
+
+COUNT_COLUMNS = ['subject', 'grade', 'marks']
+
+def iter_marks_chunks(files, fmt=DEFAULT_FORMAT, chunk_rows=CHUNK_ROWS):
+    """Yield (subject, grade, marks) DataFrames of at most `chunk_rows` rows"""
+    return iter_file_chunks(files, fmt, COUNT_COLUMNS, chunk_rows)
+
+def count_chunk(chunk):
+    """Count rows per (subject, grade, marks) value with one np.bincount
+
+    Each column is factorized to small integer codes (missing values get a code too,
+    as in Spark's groupBy), and the combined code indexes the bincount. Marks that are
+    not numbers count as missing, like Spark's cast to double.
+    """
+    subject_codes, subjects = pd.factorize(label_strings(chunk['subject']), use_na_sentinel=False)
+    grade_codes, grades = pd.factorize(label_strings(chunk['grade']), use_na_sentinel=False)
+    marks_codes, marks = pd.factorize(pd.to_numeric(chunk['marks'], errors='coerce').astype(float),
+                                      use_na_sentinel=False)
+
+    keys = (subject_codes * len(grades) + grade_codes) * len(marks) + marks_codes
+    totals = np.bincount(keys, minlength=len(subjects) * len(grades) * len(marks))
+    present = np.flatnonzero(totals)
+    subject_grade, marks_index = np.divmod(present, len(marks))
+    subject_index, grade_index = np.divmod(subject_grade, len(grades))
+    return pd.DataFrame({
+        'subject': np.asarray(subjects)[subject_index],
+        'grade': np.asarray(grades)[grade_index],
+        'marks': np.asarray(marks, dtype=float)[marks_index],
+        'count': totals[present]
+    })
+
+def count_marks(files, fmt=DEFAULT_FORMAT, chunk_rows=CHUNK_ROWS):
+    """Count rows per (subject, grade, marks) value over the given marks files
+
+    Produces the same table as spark_analysis.count_marks, one chunk at a time.
+    """
+    counts = None
+    for chunk in iter_marks_chunks(files, fmt, chunk_rows):
+        counts = merge_counts(counts, count_chunk(chunk))
+    return counts
+
+def scan_counts(fmt=DEFAULT_FORMAT, incremental=False):
+    """Marks counts from a local scan, merged with the saved state when incremental"""
+    print("Reading data files...")
+    files = table_files('marks', fmt)
+    if not files:
+        raise FileNotFoundError("No marks data found. Please run data generation first!")
+
+    return incremental_counts(files, lambda new_files: count_marks(new_files, fmt), incremental)
+
+def analyze_data(fmt=DEFAULT_FORMAT, incremental=False, columnar=False, policy=None):
+    """Analysis of student results with pandas/NumPy on a single node
+
+    Writes the same result tables as spark_analysis.analyze_data, from the same
+    (subject, grade, marks) counts and aggregate state, without starting a JVM.
+    Grades follow `policy` (default: load_policy()), which is saved resolved.
+    """
+    start_time = time.perf_counter()
+
+    with timed("count_marks", engine='local', columnar=columnar) as metrics:
+        if columnar:
+            print("Counting marks from the columnar store...")
+            counts = ColumnarMarks().counts()
+        else:
+            counts = scan_counts(fmt, incremental)
+        metrics['rows'] = int(counts['count'].sum())
+    policy = (policy or load_policy()).resolve(counts)
+    with timed("summarize_counts", rows=len(counts), policy=policy.name):
+        results = summarize_counts(counts, policy)
+
+    print("Saving analysis results...")
+    for name in RESULT_TABLES:
+        with timed("write_result", table=name, rows=len(results[name])):
+            write_table(results[name], name, fmt, RESULTS_DIR)
+    policy.save()
+
+    print("\nAnalysis Summary:")
+    print(f"Total Records Processed: {results['overall_stats']['total_entries'].iloc[0]:,}")
+    print(f"Number of Subjects: {len(results['subject_stats'])}")
+    print(f"Overall Pass Percentage: {results['performance_metrics']['pass_percentage'].iloc[0]:.2f}%")
+    print(f"Grading Policy: {policy.name}")
+    print(f"Wall Time: {time.perf_counter() - start_time:.2f}s")
+
+    print("\nAnalysis completed!")
+    return results
+
+def check_parity(fmt=DEFAULT_FORMAT, profile=None):
+    """Compare every result table of the local engine with the Spark engine
+
+    Raises AssertionError on the first difference.
+    """
+    import spark_analysis
+
+    files = table_files('marks', fmt)
+    if not files:
+        raise FileNotFoundError("No marks data found. Please run data generation first!")
+
+    local_results = summarize_counts(count_marks(files, fmt))
+    input_bytes = files_size(files)
+    spark = spark_analysis.create_spark_session(profile, input_bytes)
+    try:
+        spark_results = summarize_counts(spark_analysis.count_marks(spark, files, fmt))
+    finally:
+        spark.stop()
+
+    for name in RESULT_TABLES:
+        pd.testing.assert_frame_equal(local_results[name].reset_index(drop=True),
+                                      spark_results[name].reset_index(drop=True),
+                                      check_dtype=False)
+        print(f"  {name}: identical")
+    print("Local and Spark engines produce identical results")
+
+def main(fmt=DEFAULT_FORMAT, incremental=False, columnar=False, policy=None):
+    analyze_data(fmt, incremental, columnar, policy)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Analyze student results with pandas/NumPy")
+    parser.add_argument('--format', choices=FORMATS, default=DEFAULT_FORMAT,
+                        help="Storage format of data/ and analysis_results/ "
+                             "(default: RMS_STORAGE_FORMAT or csv)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only scan marks files added since the last run")
+    parser.add_argument('--columnar', action='store_true',
+                        help="Count marks from the memory-mapped columnar store "
+                             "(data generated with --columnar)")
+    parser.add_argument('--policy', default=None,
+                        help="Grading policy JSON file (default: RMS_GRADING_POLICY or the "
+                             "generator's grade boundaries)")
+    parser.add_argument('--check-parity', action='store_true',
+                        help="Compare the results with the Spark engine instead of writing them")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_logging()
+    if args.check_parity:
+        check_parity(args.format)
+    else:
+        main(args.format, args.incremental, args.columnar, load_policy(args.policy))
@@ -0,0 +1,158 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from storage import (DATA_DIR, DEFAULT_FORMAT, FORMATS, compact_dtypes, iter_file_chunks,
+                     read_table, table_files)
+
+# Marks grouped by student in one Parquet file, plus an offset index into it
+MARKS_BY_STUDENT_PATH = os.path.join(DATA_DIR, 'marks_by_student.parquet')
+MARKS_INDEX_PATH = os.path.join(DATA_DIR, 'marks_by_student.index.npz')
+
+# Small row groups keep a single student's read down to a few thousand rows
+ROW_GROUP_SIZE = 12000
+
+SCHEMA = pa.schema([
+    ('student_id', pa.string()),
+    ('subject', pa.dictionary(pa.int8(), pa.string())),
+    ('marks', pa.int8()),
+    ('grade', pa.dictionary(pa.int8(), pa.string()))
+])
+
+class NotGroupedError(ValueError):
+    """Raised by the grouped writers when a student's marks are not contiguous"""
+
+def student_runs(student_ids):
+    """IDs and lengths of the runs of equal consecutive student IDs"""
+    student_ids = np.asarray(student_ids)
+    if len(student_ids) == 0:
+        return student_ids, np.array([], dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, student_ids[1:] != student_ids[:-1]])
+    return student_ids[starts], np.diff(np.r_[starts, len(student_ids)])
+
+class MarksByStudentWriter:
+    """Write marks batches whose students arrive grouped (as the generator emits them)
+
+    Each student's marks must be contiguous across batches; the writer records the
+    row offset where every student starts.
+    """
+
+    def __init__(self, path=MARKS_BY_STUDENT_PATH, index_path=MARKS_INDEX_PATH):
+        self.path = path
+        self.index_path = index_path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.writer = pq.ParquetWriter(path, SCHEMA)
+        self.student_ids = []
+        self.counts = []
+
+    def write(self, marks_df):
+        batch_ids, counts = student_runs(marks_df['student_id'].astype(str).to_numpy())
+        # A student continuing from the previous batch extends its last entry
+        if self.student_ids and len(batch_ids) and batch_ids[0] == self.student_ids[-1][-1]:
+            self.counts[-1][-1] += counts[0]
+            batch_ids, counts = batch_ids[1:], counts[1:]
+        if len(batch_ids):
+            self.student_ids.append(batch_ids)
+            self.counts.append(counts)
+
+        marks_df = compact_dtypes(marks_df)[SCHEMA.names]
+        for column in ['subject', 'grade']:
+            marks_df[column] = marks_df[column].cat.as_unordered()
+        table = pa.Table.from_pandas(marks_df, schema=SCHEMA, preserve_index=False)
+        self.writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+
+    def close(self):
+        self.writer.close()
+        student_ids = np.concatenate(self.student_ids) if self.student_ids else np.array([], dtype=str)
+        counts = np.concatenate(self.counts) if self.counts else np.array([], dtype=np.int64)
+        if len(pd.unique(student_ids)) != len(student_ids):
+            raise NotGroupedError("Marks are not grouped by student; use build_marks_by_student()")
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        np.savez(self.index_path, student_ids=student_ids.astype(str), offsets=offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def remove_marks_by_student(path=MARKS_BY_STUDENT_PATH, index_path=MARKS_INDEX_PATH):
+    """Delete a marks-by-student file and its index so they cannot go stale"""
+    for stale in (path, index_path):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+def write_grouped_marks(open_writer, fmt=DEFAULT_FORMAT, chunk_rows=ROW_GROUP_SIZE * 10):
+    """Write the marks table through `open_writer()` with each student's marks contiguous
+
+    The generator writes CSV marks (single file or manifest shards) grouped by
+    student, so they are streamed in shard order. Parquet marks, partitioned by
+    subject, and CSV that turns out not to be grouped are read whole and sorted.
+    Returns the number of rows written.
+    """
+    if fmt == 'csv':
+        try:
+            rows = 0
+            with open_writer() as writer:
+                for chunk in iter_file_chunks(table_files('marks', fmt), fmt, chunk_rows=chunk_rows):
+                    writer.write(chunk)
+                    rows += len(chunk)
+            return rows
+        except NotGroupedError:
+            pass
+
+    marks = read_table('marks', fmt)
+    codes, _ = pd.factorize(marks['student_id'], sort=False)
+    marks = marks.iloc[np.argsort(codes, kind='stable')]
+    with open_writer() as writer:
+        for start in range(0, len(marks), chunk_rows):
+            writer.write(marks.iloc[start:start + chunk_rows])
+    return len(marks)
+
+def build_marks_by_student(fmt=DEFAULT_FORMAT, path=MARKS_BY_STUDENT_PATH,
+                           index_path=MARKS_INDEX_PATH):
+    """Build the marks-by-student file from the marks table"""
+    return write_grouped_marks(lambda: MarksByStudentWriter(path, index_path), fmt)
+
+class LazyMarks:
+    """Read one student's marks on demand from the marks-by-student file
+
+    Only the offset index is held in memory; a lookup reads the one or two row groups
+    that contain the student's rows.
+    """
+
+    def __init__(self, path=MARKS_BY_STUDENT_PATH, index_path=MARKS_INDEX_PATH):
+        with np.load(index_path) as index:
+            self.positions = pd.Index(index['student_ids'])
+            self.offsets = index['offsets']
+        self.file = pq.ParquetFile(path)
+        metadata = self.file.metadata
+        row_counts = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+        self.row_group_starts = np.concatenate([[0], np.cumsum(row_counts)])
+
+    def get(self, student_id):
+        """The student's marks as a DataFrame (empty if the student has none)"""
+        if student_id not in self.positions:
+            return pd.DataFrame(columns=SCHEMA.names)
+        position = self.positions.get_loc(student_id)
+        start, end = self.offsets[position], self.offsets[position + 1]
+
+        first = np.searchsorted(self.row_group_starts, start, side='right') - 1
+        last = np.searchsorted(self.row_group_starts, end - 1, side='right') - 1
+        groups = self.file.read_row_groups(list(range(first, last + 1))).to_pandas()
+        offset = self.row_group_starts[first]
+        return groups.iloc[start - offset:end - offset].reset_index(drop=True)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the marks-by-student file for lazy loading")
+    parser.add_argument('--format', choices=FORMATS, default=DEFAULT_FORMAT,
+                        help="Storage format of the marks table")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    print("Building marks-by-student file...")
+    rows = build_marks_by_student(args.format)
+    print(f"Wrote {rows:,} marks to {MARKS_BY_STUDENT_PATH}")
@@ -0,0 +1,235 @@
+import argparse
+import os
+import time
+import pandas as pd
+from sqlalchemy import (Column, Float, Index, Integer, MetaData, String, Table, create_engine,
+                        event, make_url)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import CreateTable
+import local_analysis
+from aggregates import summarize_counts
+from grading import analysis_policy
+from instrumentation import configure_logging, timed
+from storage import DATA_DIR, DEFAULT_FORMAT, FORMATS, iter_file_chunks, table_files
+
+# SQLite database built from the generator output (set RMS_DATABASE_URL to use another one)
+DATABASE_PATH = os.path.join(DATA_DIR, 'results.db')
+DATABASE_URL = os.environ.get('RMS_DATABASE_URL', f'sqlite:///{DATABASE_PATH}')
+
+# Connections kept open by the pool, and extra ones allowed under bursts of requests
+POOL_SIZE = int(os.environ.get('RMS_DB_POOL_SIZE', 10))
+MAX_OVERFLOW = 20
+
+# Rows inserted per executemany() batch while loading
+LOAD_CHUNK_ROWS = 200_000
+
+metadata = MetaData()
+
+# Raised when the generator output has duplicate keys (validation.py reports and repairs them)
+DUPLICATES_HINT = "Run `python validation.py --repair` before loading."
+
+# NOCASE on name lets SQLite answer case-insensitive prefix LIKEs from the name index
+students = Table(
+    'students', metadata,
+    Column('student_id', String, primary_key=True),
+    Column('name', String(collation='NOCASE'), nullable=False),
+    Column('age', Integer),
+    Column('batch', String),
+    Index('ix_students_name', 'name')
+)
+
+marks = Table(
+    'marks', metadata,
+    Column('student_id', String, nullable=False),
+    Column('subject', String, nullable=False),
+    Column('marks', Integer),
+    Column('grade', String),
+    # Not unique: duplicate pairs are reported by check_duplicate_marks after the load
+    Index('ix_marks_student_subject', 'student_id', 'subject'),
+    Index('ix_marks_subject', 'subject')
+)
+
+subject_stats = Table(
+    'subject_stats', metadata,
+    Column('subject', String, primary_key=True),
+    Column('average_marks', Float),
+    Column('std_deviation', Float),
+    Column('minimum_marks', Float),
+    Column('maximum_marks', Float),
+    Column('total_students', Integer),
+    Column('median_marks', Float),
+    Column('passed_students', Integer),
+    Column('failed_students', Integer),
+    Column('pass_percentage', Float)
+)
+
+grade_dist = Table(
+    'grade_dist', metadata,
+    Column('grade', String, primary_key=True),
+    Column('count', Integer)
+)
+
+def create_db_engine(url=DATABASE_URL, read_only=False, pool_size=POOL_SIZE):
+    """Engine with a connection pool shared by all request threads
+
+    SQLite connections are opened in WAL mode so readers never block each other or
+    the loader; read-only engines also refuse writes.
+    """
+    is_sqlite = url.startswith('sqlite')
+    options = {}
+    if is_sqlite:
+        options['connect_args'] = {'check_same_thread': False}
+    engine = create_engine(url, poolclass=QueuePool, pool_size=pool_size,
+                           max_overflow=MAX_OVERFLOW, **options)
+
+    if is_sqlite:
+        @event.listens_for(engine, 'connect')
+        def configure_connection(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA mmap_size=268435456')
+            if read_only:
+                cursor.execute('PRAGMA query_only=ON')
+            cursor.close()
+    return engine
+
+def bulk_insert(connection, table, df):
+    """Insert a DataFrame with one executemany() on the DB-API cursor
+
+    Column names come from the table, so DataFrame columns must be in table order.
+    """
+    df = df.astype(object).where(df.notna(), None)
+    placeholders = ', '.join('?' if connection.dialect.paramstyle == 'qmark' else '%s'
+                             for _ in table.columns)
+    sql = f'INSERT INTO {table.name} ({", ".join(table.columns.keys())}) VALUES ({placeholders})'
+    connection.exec_driver_sql(sql, list(df.itertuples(index=False, name=None)))
+
+def load_table(connection, table, files, fmt, chunk_rows=LOAD_CHUNK_ROWS):
+    """Stream a generator table into the database chunk by chunk"""
+    rows = 0
+    columns = table.columns.keys()
+    for chunk in iter_file_chunks(files, fmt, columns, chunk_rows):
+        if 'marks' in chunk:
+            chunk['marks'] = pd.to_numeric(chunk['marks'], errors='coerce')
+        bulk_insert(connection, table, chunk[columns])
+        rows += len(chunk)
+    return rows
+
+def check_duplicate_marks(connection):
+    """Raise ValueError if any (student_id, subject) pair has more than one mark
+
+    Runs after the indexes are built, so the grouping reads ix_marks_student_subject.
+    """
+    duplicates = connection.exec_driver_sql(
+        'SELECT COUNT(*) FROM (SELECT 1 FROM marks GROUP BY student_id, subject '
+        'HAVING COUNT(*) > 1)'
+    ).scalar()
+    if duplicates:
+        raise ValueError(f"{duplicates:,} (student_id, subject) pairs have more than one mark. "
+                         f"{DUPLICATES_HINT}")
+
+def sqlite_file(url):
+    """Path of the database file behind a SQLite URL (None for other or in-memory databases)"""
+    url = make_url(url)
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return None
+    return url.database
+
+def remove_sqlite_file(path):
+    """Delete a SQLite database file and its WAL side files"""
+    for stale in (path, f'{path}-wal', f'{path}-shm'):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+def build_database(url, student_files, marks_files, fmt=DEFAULT_FORMAT,
+                   chunk_rows=LOAD_CHUNK_ROWS):
+    """Create the tables at `url`, bulk load them, then index them"""
+    engine = create_db_engine(url, pool_size=1)
+    indexes = [index for table in metadata.sorted_tables for index in table.indexes]
+    with engine.begin() as connection:
+        metadata.drop_all(connection)
+        for table in metadata.sorted_tables:
+            connection.execute(CreateTable(table))
+        if engine.dialect.name == 'sqlite':
+            connection.exec_driver_sql('PRAGMA synchronous=OFF')
+
+        with timed('load_students') as metrics:
+            try:
+                metrics['rows'] = load_table(connection, students, student_files, fmt,
+                                             chunk_rows)
+            except IntegrityError as error:
+                raise ValueError(f"Duplicate student IDs found. {DUPLICATES_HINT}") from error
+        with timed('load_marks') as metrics:
+            metrics['rows'] = load_table(connection, marks, marks_files, fmt, chunk_rows)
+
+        with timed('load_summaries'):
+            results = summarize_counts(local_analysis.count_marks(marks_files, fmt),
+                                       analysis_policy())
+            stats = results['subject_stats'].merge(results['subject_performance'], on='subject')
+            bulk_insert(connection, subject_stats, stats[subject_stats.columns.keys()])
+            bulk_insert(connection, grade_dist, results['grade_dist'][grade_dist.columns.keys()])
+
+        with timed('create_indexes', indexes=len(indexes)):
+            for index in indexes:
+                index.create(connection)
+        check_duplicate_marks(connection)
+        if engine.dialect.name == 'sqlite':
+            connection.exec_driver_sql('ANALYZE')
+    engine.dispose()
+
+def load_database(fmt=DEFAULT_FORMAT, url=DATABASE_URL, chunk_rows=LOAD_CHUNK_ROWS):
+    """Rebuild the database from the generator output
+
+    Tables are created without secondary indexes, bulk loaded, then indexed, which
+    is much faster than maintaining the indexes row by row. Subject statistics and
+    the grade distribution come from the local analysis engine. Duplicate students
+    or marks raise ValueError and leave the existing database untouched: SQLite
+    commits DDL as it runs, so a SQLite file is built beside the old one and only
+    replaces it once every check has passed.
+    """
+    student_files = table_files('students', fmt)
+    marks_files = table_files('marks', fmt)
+    if not student_files or not marks_files:
+        raise FileNotFoundError("No generated data found. Please run data generation first!")
+
+    path = sqlite_file(url)
+    if path is None:
+        build_database(url, student_files, marks_files, fmt, chunk_rows)
+        return
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    building = f'{path}.building'
+    remove_sqlite_file(building)
+    build_url = make_url(url).set(database=building).render_as_string(hide_password=False)
+    try:
+        build_database(build_url, student_files, marks_files, fmt, chunk_rows)
+    except BaseException:
+        remove_sqlite_file(building)
+        raise
+    os.replace(building, path)
+
+def main(fmt=DEFAULT_FORMAT, url=DATABASE_URL):
+    print(f"Loading generator output into {url}...")
+    start_time = time.perf_counter()
+    load_database(fmt, url)
+    engine = create_db_engine(url, read_only=True, pool_size=1)
+    with engine.connect() as connection:
+        num_students = connection.exec_driver_sql('SELECT COUNT(*) FROM students').scalar()
+        num_marks = connection.exec_driver_sql('SELECT COUNT(*) FROM marks').scalar()
+    engine.dispose()
+    print(f"Loaded {num_students:,} students and {num_marks:,} marks "
+          f"in {time.perf_counter() - start_time:.1f}s")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load the generator output into the results database")
+    parser.add_argument('--format', choices=FORMATS, default=DEFAULT_FORMAT,
+                        help="Storage format of data/ (default: RMS_STORAGE_FORMAT or csv)")
+    parser.add_argument('--url', default=DATABASE_URL,
+                        help="SQLAlchemy database URL (default: RMS_DATABASE_URL or data/results.db)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_logging()
+    main(args.format, args.url)
@@ -1,91 +1,212 @@
-from pyspark.sql import SparkSession
-from pyspark.sql.functions import avg, count, col, desc, stddev, min, max, sum, when, percentile_approx
+import argparse
 import os
+import time
+import local_analysis
+from columnar_store import ColumnarMarks
+from instrumentation import configure_logging, spark_stage, timed
+from aggregates import RESULT_TABLES, incremental_counts, rank_table, summarize_counts
+from grading import load_policy
+from spark_config import PROFILES, resolve_config
+from storage import (DEFAULT_FORMAT, FORMATS, RESULTS_DIR, files_size, spark_read_files,
+                     spark_read_table, spark_write_table, table_files, write_table)
 
+# Analysis engine used when none is given: Spark, or the single-node pandas/NumPy engine
+ENGINES = ['spark', 'local']
+DEFAULT_ENGINE = os.environ.get('RMS_ANALYSIS_ENGINE', 'spark')
+
+# pyspark is imported inside the Spark code paths, so `--engine local` runs without it.
 # Set Python environment for PySpark
 os.environ['PYSPARK_PYTHON'] = 'python'
 os.environ['PYSPARK_DRIVER_PYTHON'] = 'python'
 
-def create_spark_session():
-    """Create Spark session"""
-    return SparkSession.builder \
-        .appName("StudentResults") \
-        .config("spark.python.worker.reuse", "true") \
-        .getOrCreate()
+def create_spark_session(profile=None, input_bytes=0):
+    """Create Spark session from a named configuration profile"""
+    from pyspark.sql import SparkSession
 
-def analyze_data(spark):
-    """Comprehensive analysis of student results using Spark"""
-    print("Reading data files...")
-    marks_df = spark.read.csv('data/marks.csv', header=True)
+    profile, master, config = resolve_config(profile, input_bytes)
+
+    builder = SparkSession.builder.appName("StudentResults")
+    if master:
+        builder = builder.master(master)
+    for key, value in config.items():
+        builder = builder.config(key, value)
+    spark = builder.getOrCreate()
+
+    print(f"Spark profile: {profile} (input {input_bytes / 1024 ** 2:,.1f} MB)")
+    print(f"  master = {spark.sparkContext.master}")
+    for key in sorted(config):
+        print(f"  {key} = {spark.conf.get(key, config[key])}")
+    return spark
+
+def count_marks(spark, files, fmt=DEFAULT_FORMAT):
+    """Count rows per (subject, grade, marks) value over the given marks files"""
+    from pyspark.sql.functions import col
+
+    marks_df = spark_read_files(spark, 'marks', files, fmt)
     marks_df = marks_df.withColumn("marks", col("marks").cast("double"))
-    
-    print("Calculating statistics...")
-    
-    # 1. Overall Statistics
-    overall_stats = marks_df.agg(
-        avg("marks").alias("average_marks"),
-        stddev("marks").alias("std_deviation"),
-        min("marks").alias("minimum_marks"),
-        max("marks").alias("maximum_marks"),
-        count("*").alias("total_entries")
-    )
-    
-    # 2. Subject-wise Statistics
-    subject_stats = marks_df.groupBy("subject").agg(
-        avg("marks").alias("average_marks"),
-        stddev("marks").alias("std_deviation"),
-        min("marks").alias("minimum_marks"),
-        max("marks").alias("maximum_marks"),
-        count("*").alias("total_students"),
-        percentile_approx("marks", 0.5).alias("median_marks")
-    ).orderBy("subject")
-    
-    # 3. Grade Distribution
-    grade_dist = marks_df.groupBy("grade").count().orderBy("grade")
-    
-    # 4. Performance Metrics
-    performance_metrics = marks_df.agg(
-        (count(when(col("marks") >= 40, True)) / count("*") * 100).alias("pass_percentage"),
-        (count(when(col("grade") == "A+", True)) / count("*") * 100).alias("distinction_percentage"),
-        (count(when(col("marks") < 40, True)) / count("*") * 100).alias("fail_percentage")
-    )
-    
-    # 5. Subject-wise Pass/Fail Analysis
-    subject_performance = marks_df.groupBy("subject").agg(
-        (count(when(col("marks") >= 40, True)) / count("*") * 100).alias("pass_percentage"),
-        count(when(col("marks") >= 40, True)).alias("passed_students"),
-        count(when(col("marks") < 40, True)).alias("failed_students")
-    ).orderBy(desc("pass_percentage"))
+    return marks_df.groupBy("subject", "grade", "marks").count().toPandas()
+
+def scan_counts(spark, fmt=DEFAULT_FORMAT, incremental=False):
+    """Marks counts from a Spark scan, merged with the saved state when incremental"""
+    print("Reading data files...")
+    files = table_files('marks', fmt)
+    if not files:
+        raise FileNotFoundError("No marks data found. Please run data generation first!")
+
+    return incremental_counts(files, lambda new_files: count_marks(spark, new_files, fmt),
+                              incremental)
+
+def analyze_data(spark, fmt=DEFAULT_FORMAT, incremental=False, columnar=False, policy=None):
+    """Comprehensive analysis of student results using Spark
+
+    All results are derived from one grouped scan of the marks table: the counts per
+    (subject, grade, marks) value are small enough to summarize on the driver.
+    The counts are persisted as aggregate state, so an incremental run only scans
+    marks files that were not folded in before and merges them into that state.
+    With `columnar`, the counts come from a scan of the memory-mapped columnar store
+    on the driver instead of a Spark job. Grades follow `policy` (default:
+    load_policy()), applied to the counts, so regrading never rescans the marks.
+    """
+    start_time = time.perf_counter()
+
+    with spark_stage(spark, "count_marks", engine='spark', columnar=columnar) as metrics:
+        if columnar:
+            print("Counting marks from the columnar store...")
+            counts = ColumnarMarks().counts()
+        else:
+            counts = scan_counts(spark, fmt, incremental)
+        metrics['rows'] = int(counts['count'].sum())
+    policy = (policy or load_policy()).resolve(counts)
+    with timed("summarize_counts", rows=len(counts), policy=policy.name):
+        results = summarize_counts(counts, policy)
     
     # Save results
     print("Saving analysis results...")
-    if not os.path.exists('analysis_results'):
-        os.makedirs('analysis_results')
-    
-    overall_stats.toPandas().to_csv('analysis_results/overall_stats.csv', index=False)
-    subject_stats.toPandas().to_csv('analysis_results/subject_stats.csv', index=False)
-    grade_dist.toPandas().to_csv('analysis_results/grade_dist.csv', index=False)
-    performance_metrics.toPandas().to_csv('analysis_results/performance_metrics.csv', index=False)
-    subject_performance.toPandas().to_csv('analysis_results/subject_performance.csv', index=False)
+    for name in RESULT_TABLES:
+        with timed("write_result", table=name, rows=len(results[name])):
+            write_table(results[name], name, fmt, RESULTS_DIR)
+    policy.save()
     
     # Print summary
     print("\nAnalysis Summary:")
-    print(f"Total Records Processed: {marks_df.count():,}")
-    print(f"Number of Subjects: {subject_stats.count()}")
-    
-    # Calculate and print overall pass percentage
-    pass_percent = marks_df.filter(col("marks") >= 40).count() / marks_df.count() * 100
-    print(f"Overall Pass Percentage: {pass_percent:.2f}%")
+    print(f"Total Records Processed: {results['overall_stats']['total_entries'].iloc[0]:,}")
+    print(f"Number of Subjects: {len(results['subject_stats'])}")
+    print(f"Overall Pass Percentage: {results['performance_metrics']['pass_percentage'].iloc[0]:.2f}%")
+    print(f"Grading Policy: {policy.name}")
+    print(f"Spark Jobs: {len(metrics['spark_job_ids'])}")
+    print(f"Wall Time: {time.perf_counter() - start_time:.2f}s")
     
     print("\nAnalysis completed!")
 
-def main():
+def analyze_students(spark, fmt=DEFAULT_FORMAT, policy=None):
+    """Per-student results and batch/age cohort breakdowns joined with the students table
+
+    Subjects passed use the pass marks of `policy` (default: load_policy()).
+    """
+    from pyspark.sql.functions import avg, broadcast, col, count, sum as spark_sum, when
+
+    policy = policy or load_policy()
+    print("\nCalculating student-level results...")
+    students_df = spark_read_table(spark, 'students', fmt) \
+        .withColumn("age", col("age").cast("int")) \
+        .withColumn("batch", col("batch").cast("string"))
+    marks_df = spark_read_table(spark, 'marks', fmt)
+    marks_df = marks_df.withColumn("marks", col("marks").cast("double"))
+
+    per_student = marks_df.groupBy("student_id").agg(
+        avg("marks").alias("average_marks"),
+        spark_sum(when(policy.spark_passed(col("marks"), col("subject")), 1).otherwise(0))
+        .alias("subjects_passed"),
+        count("*").alias("total_subjects")
+    ).cache()
+
+    # Rank from the (small) distribution of averages instead of a global sort window
+    with spark_stage(spark, "student_averages") as metrics:
+        average_counts = per_student.groupBy("average_marks").count().toPandas()
+        metrics['rows'] = int(average_counts['count'].sum())
+    ranks = spark.createDataFrame(rank_table(average_counts))
+
+    # Spark broadcasts the students side on its own while it is under
+    # spark.sql.autoBroadcastJoinThreshold; the rank lookup is always tiny
+    student_results = per_student \
+        .join(broadcast(ranks), "average_marks") \
+        .join(students_df, "student_id") \
+        .select("student_id", "name", "age", "batch", "average_marks", "subjects_passed",
+                "total_subjects", "overall_rank", "percentile") \
+        .cache()
+
+    with spark_stage(spark, "write_student_results"):
+        spark_write_table(student_results, 'student_results', fmt, RESULTS_DIR)
+
+    def cohort_stats(*keys):
+        with spark_stage(spark, f"cohort_stats_{'_'.join(keys)}") as metrics:
+            stats = student_results.groupBy(*keys).agg(
+                count("*").alias("students"),
+                avg("average_marks").alias("average_marks"),
+                avg("subjects_passed").alias("average_subjects_passed"),
+                (spark_sum("subjects_passed") / spark_sum("total_subjects") * 100)
+                .alias("pass_percentage")
+            ).orderBy(*keys).toPandas()
+            metrics['rows'] = len(stats)
+        return stats
+
+    batch_stats = cohort_stats("batch")
+    age_stats = cohort_stats("age")
+    batch_age_stats = cohort_stats("batch", "age")
+    write_table(batch_stats, 'batch_stats', fmt, RESULTS_DIR)
+    write_table(age_stats, 'age_stats', fmt, RESULTS_DIR)
+    write_table(batch_age_stats, 'cohort_stats', fmt, RESULTS_DIR)
+
+    print(f"Students Ranked: {int(average_counts['count'].sum()):,}")
+    print(f"Batches: {len(batch_stats)}, Age Groups: {len(age_stats)}")
+
+    student_results.unpersist()
+    per_student.unpersist()
+
+def main(fmt=DEFAULT_FORMAT, incremental=False, students=True, profile=None, columnar=False,
+         engine=DEFAULT_ENGINE, policy=None):
+    policy = policy or load_policy()
+    if engine == 'local':
+        local_analysis.main(fmt, incremental, columnar, policy)
+        if students:
+            print("Per-student and cohort results need the Spark engine; skipped")
+        return
+
     print("Initializing Spark...")
-    spark = create_spark_session()
+    input_bytes = files_size(table_files('marks', fmt))
+    spark = create_spark_session(profile, input_bytes)
     try:
-        analyze_data(spark)
+        analyze_data(spark, fmt, incremental, columnar, policy)
+        if students:
+            analyze_students(spark, fmt, policy)
     finally:
         spark.stop()
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Analyze student results with Spark")
+    parser.add_argument('--format', choices=FORMATS, default=DEFAULT_FORMAT,
+                        help="Storage format of data/ and analysis_results/ "
+                             "(default: RMS_STORAGE_FORMAT or csv)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only scan marks files added since the last run")
+    parser.add_argument('--skip-students', action='store_true',
+                        help="Skip the per-student and cohort analysis (a full scan)")
+    parser.add_argument('--profile', default=None,
+                        help=f"Spark configuration profile ({', '.join(PROFILES)} or one from "
+                             "spark_profiles.json; default: RMS_SPARK_PROFILE or local-small)")
+    parser.add_argument('--columnar', action='store_true',
+                        help="Count marks from the memory-mapped columnar store "
+                             "(data generated with --columnar)")
+    parser.add_argument('--policy', default=None,
+                        help="Grading policy JSON file (default: RMS_GRADING_POLICY or the "
+                             "generator's grade boundaries)")
+    parser.add_argument('--engine', choices=ENGINES, default=DEFAULT_ENGINE,
+                        help="Spark, or the single-node pandas/NumPy engine that writes the same "
+                             "result tables without a JVM (default: RMS_ANALYSIS_ENGINE or spark)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    args = parse_args()
+    configure_logging()
+    main(args.format, args.incremental, students=not args.skip_students, profile=args.profile,
+         columnar=args.columnar, engine=args.engine, policy=load_policy(args.policy))
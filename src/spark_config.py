@@ -0,0 +1,99 @@
+import json
+import os
+
+# Settings shared by every profile
+BASE_CONFIG = {
+    "spark.python.worker.reuse": "true",
+    "spark.sql.adaptive.enabled": "true",
+    "spark.sql.adaptive.coalescePartitions.enabled": "true",
+    # Arrow makes toPandas()/createDataFrame(pandas) columnar instead of row-by-row pickling
+    "spark.sql.execution.arrow.pyspark.enabled": "true",
+    "spark.sql.execution.arrow.pyspark.fallback.enabled": "true"
+}
+
+# Named profiles. "master" and the partition bounds are not Spark settings; they pick
+# the master URL and clamp the shuffle partitions derived from the input size.
+PROFILES = {
+    "local-small": {
+        "master": "local[*]",
+        "min_shuffle_partitions": 1,
+        "max_shuffle_partitions": 8,
+        "config": {
+            "spark.driver.memory": "2g"
+        }
+    },
+    "local-large": {
+        "master": "local[*]",
+        "min_shuffle_partitions": 8,
+        "max_shuffle_partitions": 64,
+        "config": {
+            "spark.driver.memory": "8g",
+            "spark.driver.maxResultSize": "2g"
+        }
+    },
+    "cluster": {
+        "master": None,
+        "min_shuffle_partitions": 16,
+        "max_shuffle_partitions": 2000,
+        "config": {
+            "spark.driver.memory": "4g",
+            "spark.executor.memory": "8g",
+            "spark.dynamicAllocation.enabled": "true"
+        }
+    }
+}
+
+DEFAULT_PROFILE = "local-small"
+
+# Target amount of input data per shuffle partition
+BYTES_PER_PARTITION = 128 * 1024 * 1024
+
+def load_profiles(config_path=None):
+    """Built-in profiles, updated from a JSON file if one is given or configured
+
+    The file (RMS_SPARK_CONFIG, or spark_profiles.json in the working directory) maps
+    profile names to entries shaped like PROFILES; its "config" keys are merged in.
+    """
+    profiles = {name: dict(profile, config=dict(profile["config"]))
+                for name, profile in PROFILES.items()}
+    config_path = config_path or os.environ.get("RMS_SPARK_CONFIG")
+    if config_path is None and os.path.exists("spark_profiles.json"):
+        config_path = "spark_profiles.json"
+    if config_path:
+        with open(config_path) as f:
+            overrides = json.load(f)
+        for name, override in overrides.items():
+            profile = profiles.setdefault(name, {"master": None, "config": {}})
+            profile.update({key: value for key, value in override.items() if key != "config"})
+            profile["config"].update(override.get("config", {}))
+    return profiles
+
+def shuffle_partitions(input_bytes, profile):
+    """Shuffle partitions sized to the input, clamped to the profile's bounds"""
+    wanted = -(-input_bytes // BYTES_PER_PARTITION)
+    low = profile.get("min_shuffle_partitions", 1)
+    high = profile.get("max_shuffle_partitions", 200)
+    return int(max(low, min(high, wanted)))
+
+def resolve_config(profile_name=None, input_bytes=0, config_path=None):
+    """Return (profile_name, master, effective Spark settings) for a run
+
+    RMS_SPARK_PROFILE selects the profile and RMS_SPARK_CONF ("key=value,key=value")
+    overrides individual settings last.
+    """
+    profile_name = profile_name or os.environ.get("RMS_SPARK_PROFILE", DEFAULT_PROFILE)
+    profiles = load_profiles(config_path)
+    if profile_name not in profiles:
+        raise ValueError(f"Unknown Spark profile '{profile_name}'. "
+                         f"Available: {', '.join(sorted(profiles))}")
+    profile = profiles[profile_name]
+
+    config = dict(BASE_CONFIG)
+    config["spark.sql.shuffle.partitions"] = str(shuffle_partitions(input_bytes, profile))
+    config.update(profile["config"])
+
+    for item in filter(None, os.environ.get("RMS_SPARK_CONF", "").split(",")):
+        key, _, value = item.partition("=")
+        config[key.strip()] = value.strip()
+
+    return profile_name, profile.get("master"), config
@@ -0,0 +1,212 @@
+import glob
+import json
+import os
+import shutil
+from urllib.parse import unquote
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Storage format used when none is given (set RMS_STORAGE_FORMAT=parquet to switch)
+FORMATS = ['csv', 'parquet']
+DEFAULT_FORMAT = os.environ.get('RMS_STORAGE_FORMAT', 'csv')
+
+DATA_DIR = 'data'
+RESULTS_DIR = 'analysis_results'
+
+# Hive-style partition columns for Parquet tables
+PARTITION_COLUMNS = {
+    'marks': ['subject']
+}
+
+# Compact dtypes used for the Parquet layout
+CATEGORICAL_COLUMNS = ['subject', 'grade', 'batch']
+INT8_COLUMNS = ['marks', 'age']
+
+def table_path(name, fmt=DEFAULT_FORMAT, base_dir=DATA_DIR):
+    """Path of a table: a CSV file or a Parquet dataset directory"""
+    return os.path.join(base_dir, f'{name}.{fmt}')
+
+def table_files(name, fmt=DEFAULT_FORMAT, base_dir=DATA_DIR):
+    """List the files holding a table
+
+    CSV tables fall back to the part files listed in `<base_dir>/parts/manifest.json`
+    when the single file does not exist (sharded generation).
+    """
+    path = table_path(name, fmt, base_dir)
+    if fmt == 'parquet':
+        if os.path.isdir(path):
+            return sorted(glob.glob(os.path.join(path, '**', '*.parquet'), recursive=True))
+        return [path] if os.path.exists(path) else []
+
+    if os.path.isdir(path):
+        # Directory of part files written by Spark
+        return sorted(glob.glob(os.path.join(path, '*.csv')))
+    if os.path.exists(path):
+        return [path]
+
+    manifest_path = os.path.join(base_dir, 'parts', 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        return [os.path.join(base_dir, 'parts', path)
+                for part in manifest['parts'] for path in part.get(name, [])]
+    return []
+
+def files_version(paths):
+    """Path, modification time and size of every file, usable as a cache key"""
+    version = []
+    for path in paths:
+        stat = os.stat(path)
+        version.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+def files_size(paths):
+    """Total size of the files in bytes (e.g. to size Spark partitions)"""
+    return sum(os.path.getsize(path) for path in paths)
+
+def table_version(name, fmt=DEFAULT_FORMAT, base_dir=DATA_DIR):
+    """Cache key for a table (see files_version)"""
+    return files_version(table_files(name, fmt, base_dir))
+
+def compact_dtypes(df):
+    """Convert known columns to categorical and int8 dtypes"""
+    df = df.copy()
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(str).astype('category')
+    for column in INT8_COLUMNS:
+        # Only narrow columns whose values are whole numbers that fit in int8
+        if column in df.columns and df[column].notna().all() \
+                and df[column].between(-128, 127).all() and (df[column] % 1 == 0).all():
+            df[column] = df[column].astype('int8')
+    return df
+
+def remove_table(path):
+    """Delete a table file or dataset directory if it exists"""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+class TableWriter:
+    """Append DataFrame batches to a table
+
+    CSV batches are appended to a single file. Each Parquet batch becomes its own
+    part file inside the (partitioned) dataset directory.
+    """
+
+    def __init__(self, name, fmt=DEFAULT_FORMAT, base_dir=DATA_DIR, path=None,
+                 part_prefix='part', clear=True):
+        self.fmt = fmt
+        self.path = path or table_path(name, fmt, base_dir)
+        self.partition_cols = PARTITION_COLUMNS.get(name)
+        self.part_prefix = part_prefix
+        self.batches = 0
+        self.files = []
+        self._file = None
+        if clear:
+            remove_table(self.path)
+
+    def write(self, df):
+        if self.fmt == 'csv':
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._file = open(self.path, 'w', newline='')
+                self.files.append(self.path)
+            df.to_csv(self._file, index=False, header=self.batches == 0)
+        else:
+            table = pa.Table.from_pandas(compact_dtypes(df), preserve_index=False)
+            pq.write_to_dataset(
+                table,
+                self.path,
+                partition_cols=self.partition_cols,
+                basename_template=f'{self.part_prefix}-{self.batches:05d}-{{i}}.parquet',
+                existing_data_behavior='overwrite_or_ignore',
+                file_visitor=lambda written: self.files.append(written.path)
+            )
+        self.batches += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def write_table(df, name, fmt=DEFAULT_FORMAT, base_dir=DATA_DIR):
+    """Write a whole DataFrame as a table, replacing any previous version"""
+    os.makedirs(base_dir, exist_ok=True)
+    with TableWriter(name, fmt, base_dir) as writer:
+        writer.write(df)
+
+def read_table(name, fmt=DEFAULT_FORMAT, base_dir=DATA_DIR, columns=None):
+    """Read a table into pandas"""
+    if fmt == 'parquet':
+        return pd.read_parquet(table_path(name, fmt, base_dir), columns=columns)
+
+    files = table_files(name, fmt, base_dir)
+    if not files:
+        raise FileNotFoundError(table_path(name, fmt, base_dir))
+    frames = [pd.read_csv(path, usecols=columns) for path in files]
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+def partition_value(path, column):
+    """Value of a hive partition column (`column=value` directory) in a file path"""
+    for part in path.replace(os.sep, '/').split('/'):
+        key, sep, value = part.partition('=')
+        if sep and key == column:
+            return unquote(value)
+    return None
+
+def iter_file_chunks(files, fmt=DEFAULT_FORMAT, columns=None, chunk_rows=1_000_000):
+    """Yield DataFrames of at most `chunk_rows` rows from a table's files
+
+    Parquet partition columns (stored in the directory names, not the files) are
+    filled in from each file's path.
+    """
+    for path in files:
+        if fmt == 'csv':
+            yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+            continue
+
+        parquet_file = pq.ParquetFile(path)
+        names = parquet_file.schema_arrow.names
+        file_columns = None if columns is None else [name for name in columns if name in names]
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=file_columns):
+            chunk = batch.to_pandas()
+            for column in columns or []:
+                if column not in chunk:
+                    chunk[column] = partition_value(path, column)
+            yield chunk if columns is None else chunk[columns]
+
+def spark_read_table(spark, name, fmt=DEFAULT_FORMAT, base_dir=DATA_DIR):
+    """Read a table into a Spark DataFrame"""
+    if fmt == 'parquet':
+        return spark.read.parquet(table_path(name, fmt, base_dir))
+
+    files = table_files(name, fmt, base_dir)
+    if not files:
+        raise FileNotFoundError(table_path(name, fmt, base_dir))
+    return spark.read.csv(files, header=True)
+
+def spark_read_files(spark, name, files, fmt=DEFAULT_FORMAT, base_dir=DATA_DIR):
+    """Read a subset of a table's files into a Spark DataFrame"""
+    if fmt == 'parquet':
+        # basePath keeps the partition columns when reading individual part files
+        return spark.read.option("basePath", table_path(name, fmt, base_dir)).parquet(*files)
+    return spark.read.csv(files, header=True)
+
+def spark_write_table(df, name, fmt=DEFAULT_FORMAT, base_dir=DATA_DIR):
+    """Write a Spark DataFrame as a table directory without collecting it to the driver"""
+    path = table_path(name, fmt, base_dir)
+    if fmt == 'parquet':
+        df.write.mode('overwrite').parquet(path)
+    else:
+        # Spark writes a directory of part files; read_table and table_files handle both
+        remove_table(path)
+        df.write.option('header', True).csv(path)
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+class GroupedMarks:
+    """In-memory marks grouped by student
+
+    Marks are stably sorted by the student's row position with an offsets array, so a
+    student's marks are one contiguous slice. Rows of unknown students are dropped.
+    `id_to_row` maps each student ID to its row (shared with StudentIndex).
+    """
+
+    def __init__(self, marks: pd.DataFrame, id_to_row):
+        self.id_to_row = id_to_row
+        codes = marks['student_id'].astype(str).map(id_to_row).fillna(-1) \
+            .to_numpy(dtype=np.int64)
+        order = np.argsort(codes, kind='stable')
+        order = order[codes[order] >= 0]
+        self.marks = marks.iloc[order].reset_index(drop=True)
+        counts = np.bincount(codes[codes >= 0], minlength=len(id_to_row))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def get(self, student_id):
+        row = self.id_to_row.get(student_id)
+        if row is None:
+            return self.marks.iloc[0:0]
+        return self.marks.iloc[self.offsets[row]:self.offsets[row + 1]]
+
+class StudentIndex:
+    """Lookup structures over the students and marks tables
+
+    - student_id -> row position is a dict, so ID lookups are O(1); a duplicated
+      student ID keeps its first row, like `validation.py --repair`
+    - marks come from a source with get(student_id): GroupedMarks for an in-memory
+      marks table, or marks_store.LazyMarks to read them on demand
+    - sorted arrays of IDs, lower-cased full names and name tokens give prefix searches
+      in O(log n) with np.searchsorted
+    """
+
+    def __init__(self, students: pd.DataFrame, marks):
+        student_ids = students['student_id'].astype(str)
+        self.students = students[~student_ids.duplicated().to_numpy()].reset_index(drop=True)
+        student_ids = self.students['student_id'].astype(str).to_numpy(dtype=object)
+        self.id_to_row = {student_id: row for row, student_id in enumerate(student_ids)}
+        self.student_ids = student_ids
+        self.marks = GroupedMarks(marks, self.id_to_row) if isinstance(marks, pd.DataFrame) \
+            else marks
+
+        self.sorted_ids, self.sorted_id_rows = self._sorted_keys(pd.Series(student_ids))
+
+        names = self.students['name'].fillna('').astype(str).str.lower()
+        self.sorted_names, self.sorted_name_rows = self._sorted_keys(names)
+
+        tokens = names.str.split().explode().dropna()
+        self.sorted_tokens, self.sorted_token_rows = self._sorted_keys(tokens)
+
+    @staticmethod
+    def _sorted_keys(keys: pd.Series):
+        """Sorted key array and the student row of each key"""
+        order = keys.reset_index(drop=True).argsort(kind='stable').to_numpy()
+        return keys.to_numpy(dtype=object)[order], keys.index.to_numpy()[order]
+
+    @staticmethod
+    def _prefix_rows(sorted_keys, rows, prefix):
+        """Rows whose key starts with `prefix`, in key order"""
+        start = np.searchsorted(sorted_keys, prefix, side='left')
+        end = np.searchsorted(sorted_keys, prefix + '\U0010ffff', side='left')
+        return rows[start:end]
+
+    def __len__(self):
+        return len(self.students)
+
+    def lookup_id(self, student_id):
+        """Row position of a student ID, or None"""
+        return self.id_to_row.get(student_id)
+
+    def student(self, row):
+        """The student's profile as a one-row DataFrame"""
+        return self.students.iloc[[row]]
+
+    def marks_for(self, row):
+        """The student's marks as a DataFrame slice"""
+        return self.marks.get(self.student_ids[row])
+
+    def id_prefix_rows(self, prefix):
+        """Rows whose student ID starts with `prefix` (case-sensitive, IDs are upper case)"""
+        return self._prefix_rows(self.sorted_ids, self.sorted_id_rows, prefix)
+
+    def name_prefix_rows(self, prefix):
+        """Rows whose full name starts with `prefix` (case-insensitive)"""
+        return self._prefix_rows(self.sorted_names, self.sorted_name_rows, prefix.lower())
+
+    def token_prefix_rows(self, prefix):
+        """Rows with any name word starting with `prefix` (case-insensitive)"""
+        return pd.unique(self._prefix_rows(self.sorted_tokens, self.sorted_token_rows,
+                                           prefix.lower()))
+
+    def iter_matches(self, term, chunk_size=100000):
+        """Yield (row, match type) for a search term, best matches first, without repeats
+
+        Tiers: exact ID, ID prefix, full name prefix, name word prefix, then name
+        substring. Everything is lazy, including the chunked substring scan, so callers
+        only pay for as many matches as they consume.
+        """
+        term = term.strip()
+        if not term:
+            return
+        seen = set()
+
+        def tier(rows, match):
+            for row in rows:
+                if row not in seen:
+                    seen.add(row)
+                    yield int(row), match
+
+        row = self.lookup_id(term.upper())
+        if row is not None:
+            yield from tier([row], 'Exact ID')
+        yield from tier(self.id_prefix_rows(term.upper()), 'ID prefix')
+        yield from tier(self.name_prefix_rows(term), 'Name prefix')
+        yield from tier(self.token_prefix_rows(term), 'Name word prefix')
+
+        names = self.students['name']
+        for start in range(0, len(names), chunk_size):
+            chunk = names.iloc[start:start + chunk_size]
+            hits = chunk.str.contains(term, case=False, regex=False, na=False).to_numpy()
+            yield from tier(np.flatnonzero(hits) + start, 'Name contains')
@@ -0,0 +1,365 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import numpy as np
+import pandas as pd
+from aggregates import MARKS_RANGE
+from columnar_store import remove_columnar_store
+from grading import DEFAULT_POLICY
+from instrumentation import configure_logging, spark_stage, timed
+from marks_store import remove_marks_by_student
+from storage import (DATA_DIR, DEFAULT_FORMAT, FORMATS, TableWriter, files_size, iter_file_chunks,
+                     remove_table, spark_read_table, spark_write_table, table_files, table_path)
+
+VALIDATION_ENGINES = ['local', 'spark']
+
+# Report of the last validation run, and where repaired tables are written before they
+# replace the originals
+VALIDATION_REPORT = os.path.join(DATA_DIR, 'validation_report.json')
+REPAIR_DIR = os.path.join(DATA_DIR, '_repair')
+
+# Per-row keys are spilled here in hash partitions (a power of two) while the tables
+# are scanned
+SPILL_DIR = os.path.join(DATA_DIR, '_validation')
+SPILL_PARTITIONS = 256
+
+CHUNK_ROWS = 250_000
+
+MARKS_COLUMNS = ['student_id', 'subject', 'marks', 'grade']
+
+ISSUES = {
+    'duplicate_students': "students with a duplicate student_id",
+    'duplicate_marks': "duplicate (student_id, subject) rows",
+    'invalid_marks': "missing or non-integer marks",
+    'marks_out_of_range': f"marks outside {MARKS_RANGE.start}-{MARKS_RANGE.stop - 1}",
+    'grade_mismatch': "grades that disagree with the marks",
+    'orphan_marks': "marks of unknown students",
+    'students_without_marks': "students without marks"
+}
+
+# Issues that --repair fixes (a student without marks is reported only)
+REPAIRABLE = [name for name in ISSUES if name != 'students_without_marks']
+
+def needs_repair(issues):
+    """Whether a report's issues include any that --repair fixes"""
+    return any(issues[name] for name in REPAIRABLE)
+
+def hash_keys(values):
+    """64-bit keys for string values, so IDs are compared as integers"""
+    return pd.util.hash_array(np.asarray(values, dtype=str).astype(object))
+
+def pair_keys(chunk):
+    """64-bit keys for the (student_id, subject) pairs of a marks chunk"""
+    return pd.util.hash_pandas_object(chunk[['student_id', 'subject']].astype(str),
+                                      index=False).to_numpy()
+
+class KeySpill:
+    """64-bit keys and their row numbers, hash partitioned into files under SPILL_DIR
+
+    Equal keys always land in the same partition, so duplicates and joins can be
+    resolved one partition at a time with memory bounded by the partition size.
+    """
+
+    RECORD = np.dtype([('key', np.uint64), ('row', np.int64)])
+
+    def __init__(self, name, partitions=SPILL_PARTITIONS):
+        self.paths = [os.path.join(SPILL_DIR, f'{name}-{partition:04d}.bin')
+                      for partition in range(partitions)]
+        self.shift = np.uint64(64 - (partitions - 1).bit_length())
+
+    def write(self, keys, rows):
+        parts = (keys >> self.shift).astype(np.int64) if len(self.paths) > 1 \
+            else np.zeros(len(keys), dtype=np.int64)
+        order = np.argsort(parts, kind='stable')
+        records = np.empty(len(keys), dtype=self.RECORD)
+        records['key'] = keys[order]
+        records['row'] = rows[order]
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(parts, minlength=len(self.paths)))])
+        for partition in np.flatnonzero(np.diff(bounds)):
+            with open(self.paths[partition], 'ab') as f:
+                records[bounds[partition]:bounds[partition + 1]].tofile(f)
+
+    def read(self, partition):
+        """Keys and row numbers of one partition, in the order they were written"""
+        path = self.paths[partition]
+        if not os.path.exists(path):
+            return np.empty(0, np.uint64), np.empty(0, np.int64)
+        records = np.fromfile(path, dtype=self.RECORD)
+        return records['key'], records['row']
+
+def first_rows(keys, rows):
+    """Unique keys and the rows that are not the first occurrence of their key"""
+    unique_keys, first = np.unique(keys, return_index=True)
+    repeated = np.ones(len(keys), dtype=bool)
+    repeated[first] = False
+    return unique_keys, rows[repeated]
+
+def lookup(sorted_keys, keys):
+    """Positions of keys in a sorted unique key array, and whether each was found"""
+    positions = np.searchsorted(sorted_keys, keys)
+    positions[positions == len(sorted_keys)] = 0
+    found = sorted_keys[positions] == keys if len(sorted_keys) else np.zeros(len(keys), bool)
+    return positions, found
+
+def check_marks(chunk, policy=DEFAULT_POLICY):
+    """Row-level checks of a marks chunk
+
+    Returns the marks as floats, the expected grades under `policy` (None where the
+    marks are unusable) and boolean arrays for the invalid, out of range and
+    mismatched rows.
+    """
+    marks = pd.to_numeric(chunk['marks'], errors='coerce').to_numpy(dtype=float)
+    invalid = np.isnan(marks) | (np.nan_to_num(marks) % 1 != 0)
+    out_of_range = ~invalid & ((marks < MARKS_RANGE.start) | (marks >= MARKS_RANGE.stop))
+    usable = ~invalid & ~out_of_range
+
+    expected = np.where(usable, policy.grades(chunk['subject'], marks), None)
+    mismatch = usable & (chunk['grade'].astype(str).to_numpy(dtype=object) != expected)
+    return marks, expected, invalid, out_of_range, mismatch
+
+def validate_local(fmt=DEFAULT_FORMAT, policy=DEFAULT_POLICY, repair=False, chunk_rows=CHUNK_ROWS):
+    """Validate the students and marks tables in one streaming pass with pandas/NumPy
+
+    Row-level checks run per chunk. The 8-byte ID keys needed for the duplicate and
+    orphan checks are spilled to SPILL_PARTITIONS hash partitions on disk and checked
+    one partition at a time, so memory depends on the chunk and partition sizes, not
+    on the number of rows. Repair makes a second pass that writes the tables without
+    duplicates (the first occurrence is kept), without marks that are unusable or
+    belong to unknown students, and with every grade recomputed.
+    """
+    student_files = table_files('students', fmt)
+    marks_files = table_files('marks', fmt)
+    if not student_files or not marks_files:
+        raise FileNotFoundError("No generated data found. Please run data generation first!")
+
+    issues = dict.fromkeys(ISSUES, 0)
+    shutil.rmtree(SPILL_DIR, ignore_errors=True)
+    os.makedirs(SPILL_DIR)
+    try:
+        students = KeySpill('students', SPILL_PARTITIONS)
+        marks_students = KeySpill('marks-students', SPILL_PARTITIONS)
+        marks_pairs = KeySpill('marks-pairs', SPILL_PARTITIONS)
+        with timed('validate_students') as metrics:
+            num_students = 0
+            for chunk in iter_file_chunks(student_files, fmt, ['student_id'], chunk_rows):
+                rows = np.arange(num_students, num_students + len(chunk))
+                students.write(hash_keys(chunk['student_id']), rows)
+                num_students += len(chunk)
+            metrics['rows'] = num_students
+
+        with timed('validate_marks') as metrics:
+            num_marks = 0
+            for chunk in iter_file_chunks(marks_files, fmt, MARKS_COLUMNS, chunk_rows):
+                _, _, invalid, out_of_range, mismatch = check_marks(chunk, policy)
+                issues['invalid_marks'] += int(invalid.sum())
+                issues['marks_out_of_range'] += int(out_of_range.sum())
+                issues['grade_mismatch'] += int(mismatch.sum())
+                rows = np.arange(num_marks, num_marks + len(chunk))
+                marks_students.write(hash_keys(chunk['student_id']), rows)
+                marks_pairs.write(pair_keys(chunk), rows)
+                num_marks += len(chunk)
+            metrics['rows'] = num_marks
+
+        # Rows dropped by repair: repeated students, repeated pairs and orphan marks
+        drop_students, drop_marks = [], []
+        with timed('validate_keys', partitions=SPILL_PARTITIONS):
+            for partition in range(SPILL_PARTITIONS):
+                known_students, repeated = first_rows(*students.read(partition))
+                issues['duplicate_students'] += len(repeated)
+                drop_students.append(repeated)
+
+                keys, rows = marks_students.read(partition)
+                positions, found = lookup(known_students, keys)
+                issues['orphan_marks'] += int((~found).sum())
+                issues['students_without_marks'] += \
+                    len(known_students) - len(np.unique(positions[found]))
+                drop_marks.append(rows[~found])
+
+                _, repeated = first_rows(*marks_pairs.read(partition))
+                issues['duplicate_marks'] += len(repeated)
+                drop_marks.append(repeated)
+    finally:
+        shutil.rmtree(SPILL_DIR, ignore_errors=True)
+
+    report = {'engine': 'local', 'format': fmt, 'students': num_students,
+              'marks': num_marks, 'issues': issues}
+    if repair and needs_repair(issues):
+        report['repaired'] = repair_local(fmt, student_files, marks_files,
+                                          np.unique(np.concatenate(drop_students)),
+                                          np.unique(np.concatenate(drop_marks)),
+                                          policy, chunk_rows)
+    return report
+
+def repair_local(fmt, student_files, marks_files, drop_students, drop_marks,
+                 policy=DEFAULT_POLICY, chunk_rows=CHUNK_ROWS):
+    """Rewrite the tables without the validation pass's dropped rows, then regrade
+
+    `drop_students` and `drop_marks` are sorted row numbers; unusable marks are
+    dropped as they are read.
+    """
+    os.makedirs(REPAIR_DIR, exist_ok=True)
+    written = {'students': 0, 'marks': 0}
+    with timed('repair_tables') as metrics:
+        with TableWriter('students', fmt, REPAIR_DIR) as writer:
+            offset = 0
+            for chunk in iter_file_chunks(student_files, fmt, None, chunk_rows):
+                keep = ~lookup(drop_students, np.arange(offset, offset + len(chunk)))[1]
+                offset += len(chunk)
+                chunk = chunk[keep]
+                writer.write(chunk)
+                written['students'] += len(chunk)
+        with TableWriter('marks', fmt, REPAIR_DIR) as writer:
+            offset = 0
+            for chunk in iter_file_chunks(marks_files, fmt, MARKS_COLUMNS, chunk_rows):
+                marks, expected, invalid, out_of_range, _ = check_marks(chunk, policy)
+                dropped = lookup(drop_marks, np.arange(offset, offset + len(chunk)))[1]
+                keep = ~dropped & ~invalid & ~out_of_range
+                offset += len(chunk)
+                chunk = chunk[keep].assign(marks=marks[keep].astype(np.int64), grade=expected[keep])
+                writer.write(chunk)
+                written['marks'] += len(chunk)
+        metrics['rows'] = written['marks']
+    replace_tables(['students', 'marks'], fmt)
+    return written
+
+def replace_tables(names, fmt=DEFAULT_FORMAT):
+    """Move repaired tables from REPAIR_DIR over the originals
+
+    Repaired tables use the single-table layout, which takes precedence over the part
+    files of a sharded run. Marks stores built from the old marks are removed.
+    """
+    for name in names:
+        remove_table(table_path(name, fmt))
+        os.replace(table_path(name, fmt, REPAIR_DIR), table_path(name, fmt))
+    shutil.rmtree(REPAIR_DIR)
+    remove_marks_by_student()
+    remove_columnar_store()
+
+def validate_spark(fmt=DEFAULT_FORMAT, policy=DEFAULT_POLICY, repair=False, profile=None):
+    """Validate with Spark: the same checks and repair as validate_local, for large inputs
+
+    Repair keeps an arbitrary row of each duplicate group rather than the first one.
+    """
+    from pyspark.sql.functions import col, count, floor, lit, sum as spark_sum, when
+    import spark_analysis
+
+    marks_files = table_files('marks', fmt)
+    if not table_files('students', fmt) or not marks_files:
+        raise FileNotFoundError("No generated data found. Please run data generation first!")
+
+    spark = spark_analysis.create_spark_session(profile, files_size(marks_files))
+    try:
+        students_df = spark_read_table(spark, 'students', fmt)
+        marks_df = spark_read_table(spark, 'marks', fmt)
+        known = students_df.select('student_id').distinct().withColumn('known', lit(True))
+
+        value = col('marks').cast('double')
+        invalid = value.isNull() | (value != floor(value))
+        out_of_range = ~invalid & ((value < MARKS_RANGE.start) | (value >= MARKS_RANGE.stop))
+        expected = policy.spark_grade(value, col('subject'))
+
+        def flag(condition):
+            return spark_sum(when(condition, 1).otherwise(0))
+
+        with spark_stage(spark, 'validate_marks') as metrics:
+            row = marks_df.join(known, 'student_id', 'left').agg(
+                count('*').alias('marks'),
+                flag(invalid).alias('invalid_marks'),
+                flag(out_of_range).alias('marks_out_of_range'),
+                flag(~invalid & ~out_of_range & ~col('grade').cast('string').eqNullSafe(expected))
+                .alias('grade_mismatch'),
+                flag(col('known').isNull()).alias('orphan_marks')
+            ).first().asDict()
+            metrics['rows'] = row['marks']
+        with spark_stage(spark, 'validate_duplicates'):
+            duplicate_marks = marks_df.groupBy('student_id', 'subject').count() \
+                .agg(spark_sum(col('count') - 1)).first()[0]
+            per_student = students_df.groupBy('student_id').count() \
+                .join(marks_df.select('student_id').distinct().withColumn('has_marks', lit(True)),
+                      'student_id', 'left') \
+                .agg(spark_sum('count'), spark_sum(col('count') - 1),
+                     flag(col('has_marks').isNull())) \
+                .first()
+
+        issues = {
+            'duplicate_students': int(per_student[1] or 0),
+            'duplicate_marks': int(duplicate_marks or 0),
+            **{name: int(row[name] or 0) for name in
+               ['invalid_marks', 'marks_out_of_range', 'grade_mismatch', 'orphan_marks']},
+            'students_without_marks': int(per_student[2] or 0)
+        }
+        report = {'engine': 'spark', 'format': fmt, 'students': int(per_student[0] or 0),
+                  'marks': int(row['marks']), 'issues': issues}
+
+        if repair and needs_repair(issues):
+            repaired_students = students_df.dropDuplicates(['student_id'])
+            repaired_marks = marks_df.dropDuplicates(['student_id', 'subject']) \
+                .join(known.select('student_id'), 'student_id', 'left_semi') \
+                .filter(~invalid & ~out_of_range) \
+                .withColumn('grade', expected) \
+                .withColumn('marks', value.cast('int')) \
+                .select(*MARKS_COLUMNS)
+            with spark_stage(spark, 'repair_tables'):
+                spark_write_table(repaired_students, 'students', fmt, REPAIR_DIR)
+                spark_write_table(repaired_marks, 'marks', fmt, REPAIR_DIR)
+            replace_tables(['students', 'marks'], fmt)
+            report['repaired'] = {
+                'students': spark_read_table(spark, 'students', fmt).count(),
+                'marks': spark_read_table(spark, 'marks', fmt).count()
+            }
+    finally:
+        spark.stop()
+    return report
+
+def print_report(report):
+    print("\nValidation Results:")
+    print(f"Number of students: {report['students']:,}")
+    print(f"Number of mark entries: {report['marks']:,}")
+    for name, description in ISSUES.items():
+        found = report['issues'][name]
+        print(f"  {'!' if found else ' '} {description}: {found:,}")
+    total = sum(report['issues'].values())
+    print("No issues found" if total == 0 else f"Warning: {total:,} problem rows found!")
+    if 'repaired' in report:
+        print(f"Repaired: kept {report['repaired']['students']:,} students and "
+              f"{report['repaired']['marks']:,} mark entries (duplicates and unusable "
+              f"marks removed, grades recomputed)")
+
+def validate_data(fmt=DEFAULT_FORMAT, engine='local', repair=False, profile=None,
+                  policy=DEFAULT_POLICY):
+    """Validate (and optionally repair) the generated data and write VALIDATION_REPORT
+
+    Grades are checked against `policy`, by default the one the generator grades with.
+    """
+    if engine == 'spark':
+        report = validate_spark(fmt, policy, repair, profile)
+    else:
+        report = validate_local(fmt, policy, repair)
+    os.makedirs(os.path.dirname(VALIDATION_REPORT), exist_ok=True)
+    with open(VALIDATION_REPORT, 'w') as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    return report
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Validate and repair the generated data")
+    parser.add_argument('--format', choices=FORMATS, default=DEFAULT_FORMAT,
+                        help="Storage format of data/ (default: RMS_STORAGE_FORMAT or csv)")
+    parser.add_argument('--engine', choices=VALIDATION_ENGINES, default='local',
+                        help="Streaming pandas/NumPy pass, or a Spark job for large inputs")
+    parser.add_argument('--profile', default=None,
+                        help="Spark configuration profile for --engine spark")
+    parser.add_argument('--repair', action='store_true',
+                        help="Rewrite the tables without duplicates or unusable marks, "
+                             "with grades recomputed from the marks")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_logging()
+    report = validate_data(args.format, args.engine, args.repair, args.profile)
+    # Non-zero exit when unrepaired issues remain, so pipelines can stop before analysis
+    if not args.repair and any(report['issues'].values()):
+        sys.exit(1)
@@ -0,0 +1,84 @@
+import sqlite3
+import pandas as pd
+import pytest
+from api import create_app
+from results_db import load_database
+from storage import write_table
+
+STUDENTS = pd.DataFrame({
+    'student_id': ['STU00001', 'STU00002', 'STU00003', 'STU00004'],
+    'name': ['Alice Smith', 'alan Jones', 'Bob Brown', 'Al_ Literal'],
+    'age': [20, 21, 22, 23],
+    'batch': [2024, 2024, 2025, 2025]
+})
+
+MARKS = pd.DataFrame({
+    'student_id': ['STU00001', 'STU00001', 'STU00002', 'STU00003'],
+    'subject': ['DSA', 'Mathematics', 'DSA', 'DSA'],
+    'marks': [91, 38, 55, 'absent'],
+    'grade': ['A+', 'F', 'C', None]
+})
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A results database loaded from a small generator output in a fresh directory"""
+    monkeypatch.chdir(tmp_path)
+    write_table(STUDENTS, 'students', 'csv')
+    write_table(MARKS, 'marks', 'csv')
+    url = f"sqlite:///{tmp_path / 'results.db'}"
+    load_database('csv', url)
+    return url
+
+@pytest.fixture
+def client(database):
+    return create_app(database, pool_size=1).test_client()
+
+def test_student_lookup(client):
+    response = client.get('/students/stu00001')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['student_id'] == 'STU00001'
+    assert body['average_marks'] == pytest.approx(64.5)
+    assert (body['subjects_passed'], body['total_subjects']) == (1, 2)
+    assert [(row['subject'], row['grade']) for row in body['marks']] == \
+        [('DSA', 'A+'), ('Mathematics', 'F')]
+
+def test_unreadable_mark_is_loaded_as_missing(client):
+    body = client.get('/students/STU00003').get_json()
+    assert body['marks'][0]['marks'] is None
+    assert (body['average_marks'], body['subjects_passed']) == (None, 0)
+
+def test_search_is_case_insensitive_prefix_and_paged(client):
+    first = client.get('/students?name=AL&limit=1').get_json()
+    assert [row['name'] for row in first['results']] == ['Al_ Literal']
+    assert first['has_more']
+
+    rest = client.get('/students?name=al&limit=5&offset=1').get_json()
+    assert [row['name'] for row in rest['results']] == ['alan Jones', 'Alice Smith']
+    assert not rest['has_more']
+
+    # LIKE wildcards in the term only match literally
+    literal = client.get('/students?name=al_').get_json()
+    assert [row['student_id'] for row in literal['results']] == ['STU00004']
+
+@pytest.mark.parametrize('query', ['name=al&limit=0', 'name=al&limit=101',
+                                   'name=al&offset=-1', 'name=al&limit=ten', 'name='])
+def test_bad_search_arguments(client, query):
+    response = client.get(f'/students?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Bad Request'
+
+@pytest.mark.parametrize('path', ['/students/STU99999', '/subjects/Art/stats', '/no/such/route'])
+def test_not_found_is_json(client, path):
+    response = client.get(path)
+    assert response.status_code == 404
+    assert response.get_json()['error'] == 'Not Found'
+
+def test_failed_load_keeps_existing_database(database, tmp_path):
+    write_table(pd.concat([MARKS, MARKS.head(1)]), 'marks', 'csv')
+    with pytest.raises(ValueError, match='validation.py --repair'):
+        load_database('csv', database)
+
+    with sqlite3.connect(tmp_path / 'results.db') as connection:
+        assert connection.execute('SELECT COUNT(*) FROM marks').fetchone() == (4,)
+    assert not (tmp_path / 'results.db.building').exists()
@@ -0,0 +1,73 @@
+import glob
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+pytest.importorskip('pyspark')
+
+import local_analysis
+import spark_analysis
+from aggregates import RESULT_TABLES
+from data_generator import write_streaming
+from grading import DEFAULT_POLICY, GradingPolicy
+from storage import RESULTS_DIR, read_table
+
+CURVED_POLICY = GradingPolicy(pass_mark=45, curve=[0, 30, 50, 70, 85, 95],
+                              subjects={'DSA': {'pass_mark': 35}}, name='curved')
+
+@pytest.fixture(scope='module')
+def spark():
+    session = spark_analysis.create_spark_session('local-small')
+    yield session
+    session.stop()
+
+def add_dirty_marks(fmt):
+    """Append marks rows with a missing grade and a missing or unreadable mark"""
+    if fmt == 'csv':
+        with open('data/marks.csv', 'a') as f:
+            f.write('STU00001,DSA,absent,\nSTU00002,,61,B\n')
+        return
+    # An extra part in an existing subject partition, written with the same schema
+    part = sorted(glob.glob('data/marks.parquet/subject=DSA/*.parquet'))[0]
+    schema = pq.read_schema(part)
+    dirty = pd.DataFrame({'student_id': ['STU00001'], 'marks': [None], 'grade': [None]})
+    table = pa.Table.from_pandas(dirty, schema=schema.remove_metadata(), preserve_index=False)
+    pq.write_table(table, os.path.join(os.path.dirname(part), 'dirty.parquet'))
+
+@pytest.fixture(params=['csv', 'parquet'])
+def dataset(request, tmp_path, monkeypatch):
+    """A small seeded dataset, plus a few dirty marks rows, in a fresh working directory"""
+    monkeypatch.chdir(tmp_path)
+    write_streaming(num_students=2000, batch_size=500, seed=7, fmt=request.param, report=False)
+    add_dirty_marks(request.param)
+    return request.param
+
+def read_results(fmt):
+    return {name: read_table(name, fmt, RESULTS_DIR).reset_index(drop=True)
+            for name in RESULT_TABLES}
+
+def assert_same_results(expected, actual):
+    for name in RESULT_TABLES:
+        pd.testing.assert_frame_equal(expected[name], actual[name], check_dtype=False,
+                                      obj=name)
+
+@pytest.mark.parametrize('policy', [DEFAULT_POLICY, CURVED_POLICY], ids=['default', 'curved'])
+def test_analyze_data_parity(spark, dataset, policy):
+    local_analysis.analyze_data(dataset, policy=policy)
+    local_results = read_results(dataset)
+    spark_analysis.analyze_data(spark, dataset, policy=policy)
+    assert_same_results(local_results, read_results(dataset))
+
+def test_incremental_state_is_shared(spark, dataset):
+    # Every run saves its counts as aggregate state; an incremental run with no new
+    # files answers from the state the other engine saved
+    local_analysis.analyze_data(dataset)
+    expected = read_results(dataset)
+    spark_analysis.analyze_data(spark, dataset, incremental=True)
+    assert_same_results(expected, read_results(dataset))
+
+    spark_analysis.analyze_data(spark, dataset)
+    local_analysis.analyze_data(dataset, incremental=True)
+    assert_same_results(expected, read_results(dataset))
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from grading import DEFAULT_POLICY, GradingPolicy
+
+SUBJECT_POLICY = GradingPolicy(pass_mark=40, subjects={
+    'DSA': {'grade_bins': [0, 40, 55, 65, 75, 85, 101], 'pass_mark': 35},
+    'Mathematics': {'pass_mark': 50}
+})
+
+def test_default_bins_and_boundaries():
+    marks = [0, 49, 50, 59.5, 60, 79, 80, 89, 90, 100]
+    assert DEFAULT_POLICY.grades(['DSA'] * len(marks), marks).tolist() == \
+        ['F', 'F', 'D', 'D', 'C', 'B', 'A', 'A', 'A+', 'A+']
+
+def test_missing_and_out_of_range_marks_get_no_grade():
+    marks = [np.nan, -1, 101, 250, 100]
+    assert DEFAULT_POLICY.grade_codes(['DSA'] * 5, marks).tolist() == [-1, -1, -1, -1, 5]
+    assert DEFAULT_POLICY.grades(['DSA'] * 5, marks).tolist() == [None, None, None, None, 'A+']
+
+def test_subject_bins_override_only_that_subject():
+    subjects = ['DSA', 'Mathematics', None, 'DSA']
+    codes = SUBJECT_POLICY.grade_codes(subjects, [45, 45, 45, np.nan])
+    # DSA's bins give 45 a D; other subjects, and a missing one, use the default bins
+    assert codes.tolist() == [1, 0, 0, -1]
+
+def test_subject_pass_marks():
+    subjects = ['DSA', 'DSA', 'Mathematics', 'Mathematics', 'Physics', 'Physics']
+    marks = [35, 34, 50, 49, 40, np.nan]
+    assert SUBJECT_POLICY.passed(subjects, marks).tolist() == \
+        [True, False, True, False, True, False]
+
+def test_resolve_turns_the_curve_into_subject_bins():
+    counts = pd.DataFrame({
+        'subject': ['DSA'] * 4 + ['Mathematics'] * 2 + ['DSA'],
+        'marks': [20, 40, 60, 80, 10, 90, np.nan],
+        'count': [25, 25, 25, 25, 1, 1, 9]
+    })
+    policy = GradingPolicy(grade_bins=[0, 50, 101], grade_labels=['F', 'P'], curve=[0, 50],
+                           distinction_grade='P', subjects={'Mathematics': {'pass_mark': 30}},
+                           name='curved')
+    resolved = policy.resolve(counts)
+
+    # Half of DSA's marks are below 60, half of Mathematics' below 90; missing marks
+    # do not count
+    assert resolved.curve is None
+    assert resolved.bins_for('DSA') == [0, 60, 101]
+    assert resolved.bins_for('Mathematics') == [0, 90, 101]
+    assert resolved.pass_mark_for('Mathematics') == 30
+    assert resolved.grades(['DSA', 'DSA', 'Mathematics'], [59, 60, 60]).tolist() == ['F', 'P', 'F']
+
+    assert DEFAULT_POLICY.resolve(counts) is DEFAULT_POLICY
+
+def test_dict_round_trip():
+    policy = GradingPolicy(curve=[0, 30, 50, 70, 85, 95], name='curved',
+                           subjects=SUBJECT_POLICY.subjects)
+    assert GradingPolicy.from_dict(policy.to_dict()).to_dict() == policy.to_dict()
+
+@pytest.mark.parametrize('options', [
+    {'grade_bins': [0, 50, 101]},
+    {'grade_bins': [0, 60, 50, 70, 80, 90, 101]},
+    {'curve': [10, 30, 50, 70, 85, 95]},
+    {'distinction_grade': 'S'}
+])
+def test_invalid_policies_are_rejected(options):
+    with pytest.raises(ValueError):
+        GradingPolicy(**options)
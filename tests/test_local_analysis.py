@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from data_generator import generate_marks_fast, generate_student_profiles_fast
+from aggregates import MISSING_LABEL, merge_counts
+from local_analysis import COUNT_COLUMNS, count_chunk, count_marks
+from storage import write_table
+
+def sample_marks(num_students=500, seed=7):
+    """Generated marks plus rows with missing or unusable values"""
+    students = generate_student_profiles_fast(num_students, seed=seed)
+    marks = generate_marks_fast(students, seed=seed + 1)
+    marks['grade'] = marks['grade'].astype(str)
+    extra = pd.DataFrame({
+        'student_id': ['STU00001', 'STU00002', 'STU00003', 'STU00004'],
+        'subject': ['DSA', 'DSA', 'DSA', None],
+        'marks': [np.nan, 55, 'absent', 70],
+        'grade': ['F', None, np.nan, 'B']
+    })
+    return pd.concat([marks, extra], ignore_index=True)
+
+def groupby_counts(marks):
+    """The (subject, grade, marks) counts computed the plain pandas way"""
+    keys = pd.DataFrame({
+        'subject': marks['subject'].fillna(MISSING_LABEL).astype(str),
+        'grade': marks['grade'].fillna(MISSING_LABEL).astype(str),
+        'marks': pd.to_numeric(marks['marks'], errors='coerce').astype(float)
+    })
+    return keys.groupby(COUNT_COLUMNS, dropna=False).size().rename('count').reset_index()
+
+def sorted_counts(counts):
+    counts = counts[COUNT_COLUMNS + ['count']].astype({'count': np.int64})
+    return counts.sort_values(COUNT_COLUMNS, na_position='last').reset_index(drop=True)
+
+def test_count_chunk_matches_groupby():
+    marks = sample_marks()
+    pd.testing.assert_frame_equal(sorted_counts(count_chunk(marks)),
+                                  sorted_counts(groupby_counts(marks)))
+
+def test_count_marks_merges_chunks(tmp_path):
+    marks = sample_marks()
+    write_table(marks, 'marks', 'csv', str(tmp_path))
+    counts = count_marks([str(tmp_path / 'marks.csv')], 'csv', chunk_rows=997)
+    pd.testing.assert_frame_equal(sorted_counts(counts), sorted_counts(groupby_counts(marks)))
+
+def test_missing_labels_merge_across_engines():
+    # pandas reads a missing grade as NaN, Spark's counts carry None
+    local = count_chunk(pd.DataFrame({'subject': ['DSA'], 'grade': [np.nan], 'marks': ['x']}))
+    spark = pd.DataFrame({'subject': ['DSA'], 'grade': [None], 'marks': [np.nan], 'count': [2]})
+    merged = merge_counts(local, spark)
+    assert merged[['subject', 'grade', 'count']].values.tolist() == [['DSA', MISSING_LABEL, 3]]
+    assert merged['marks'].isna().all()
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+import validation
+from storage import read_table, write_table
+
+STUDENTS = pd.DataFrame({
+    'student_id': ['STU00001', 'STU00002', 'STU00003', 'STU00004', 'STU00003', 'STU00005',
+                   'STU00006'],
+    'name': ['Ann', 'Ben', 'Cara', 'Dev', 'Cara Again', 'Eve', 'Finn'],
+    'age': [20, 21, 22, 23, 24, 25, 26],
+    'batch': [2024] * 7
+})
+
+# (student_id, subject, marks, grade); the comments give the issue each row carries
+MARKS = pd.DataFrame([
+    ('STU00001', 'DSA', 80, 'A'),
+    ('STU00001', 'Mathematics', 70, 'B'),
+    ('STU00002', 'DSA', 60, 'C'),
+    ('STU00001', 'DSA', 10, 'F'),                 # duplicate pair, in a later chunk
+    ('STU00002', 'Mathematics', 'absent', 'F'),   # invalid
+    ('STU00003', 'DSA', 150, 'A+'),               # out of range
+    ('STU00004', 'DSA', 55, 'A+'),                # grade mismatch
+    ('STU00099', 'DSA', 50, 'D'),                 # orphan
+    ('STU00005', 'DSA', 40, 'F'),
+    ('STU00002', 'DSA', 95, 'A+'),                # duplicate pair
+    ('STU00005', 'Mathematics', -5, 'F'),         # out of range
+], columns=['student_id', 'subject', 'marks', 'grade'])
+
+EXPECTED_ISSUES = {
+    'duplicate_students': 1,
+    'duplicate_marks': 2,
+    'invalid_marks': 1,
+    'marks_out_of_range': 2,
+    'grade_mismatch': 1,
+    'orphan_marks': 1,
+    'students_without_marks': 1
+}
+
+@pytest.fixture
+def corrupted(tmp_path, monkeypatch):
+    """The corrupted tables above in a fresh working directory"""
+    monkeypatch.chdir(tmp_path)
+    write_table(STUDENTS, 'students', 'csv')
+    write_table(MARKS, 'marks', 'csv')
+
+def test_first_rows_keeps_first_occurrence():
+    keys = np.array([5, 3, 5, 3, 7], dtype=np.uint64)
+    unique_keys, repeated = validation.first_rows(keys, np.arange(10, 15))
+    assert unique_keys.tolist() == [3, 5, 7]
+    assert repeated.tolist() == [12, 13]
+
+def test_key_spill_partitions_by_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(validation, 'SPILL_DIR', str(tmp_path))
+    spill = validation.KeySpill('keys', 4)
+    keys = validation.hash_keys(['a', 'b', 'a', 'c', 'b'])
+    spill.write(keys[:3], np.arange(3))
+    spill.write(keys[3:], np.arange(3, 5))
+
+    read = [spill.read(partition) for partition in range(4)]
+    assert sorted(row for _, rows in read for row in rows) == [0, 1, 2, 3, 4]
+    for partition_keys, rows in read:
+        # Every occurrence of a key is in one partition, in the order it was written
+        assert (partition_keys == keys[rows]).all()
+        assert (np.diff(rows) > 0).all()
+
+@pytest.mark.parametrize('partitions, chunk_rows', [(1, 1000), (4, 3), (16, 2)])
+def test_validate_counts_every_issue(corrupted, monkeypatch, partitions, chunk_rows):
+    monkeypatch.setattr(validation, 'SPILL_PARTITIONS', partitions)
+    report = validation.validate_local('csv', chunk_rows=chunk_rows)
+    assert (report['students'], report['marks']) == (len(STUDENTS), len(MARKS))
+    assert report['issues'] == EXPECTED_ISSUES
+    assert 'repaired' not in report
+
+def test_repair_keeps_first_rows_and_regrades(corrupted, monkeypatch):
+    monkeypatch.setattr(validation, 'SPILL_PARTITIONS', 4)
+    report = validation.validate_local('csv', repair=True, chunk_rows=3)
+    assert report['repaired'] == {'students': 6, 'marks': 5}
+
+    students = read_table('students', 'csv')
+    assert students['student_id'].tolist() == ['STU00001', 'STU00002', 'STU00003', 'STU00004',
+                                                'STU00005', 'STU00006']
+    assert students.loc[students['student_id'] == 'STU00003', 'name'].item() == 'Cara'
+
+    marks = read_table('marks', 'csv')
+    assert marks.values.tolist() == [
+        ['STU00001', 'DSA', 80, 'A'],
+        ['STU00001', 'Mathematics', 70, 'B'],
+        ['STU00002', 'DSA', 60, 'C'],
+        ['STU00004', 'DSA', 55, 'D'],
+        ['STU00005', 'DSA', 40, 'F']
+    ]
+
+    # Only the unrepairable issue is left
+    issues = validation.validate_local('csv', chunk_rows=3)['issues']
+    assert issues == dict(dict.fromkeys(EXPECTED_ISSUES, 0), students_without_marks=2)